@@ -111,6 +111,31 @@ class Ui_DebugDialog(object):
         self.le_keywords.setMaximumSize(QtCore.QSize(16777215, 16777215))
         self.le_keywords.setObjectName("le_keywords")
         self.gridLayout.addWidget(self.le_keywords, 1, 0, 1, 1)
+        self.sb_record_frame = QtWidgets.QSpinBox(self.widget_2)
+        self.sb_record_frame.setEnabled(False)
+        self.sb_record_frame.setMinimumSize(QtCore.QSize(100, 0))
+        self.sb_record_frame.setObjectName("sb_record_frame")
+        self.gridLayout.addWidget(self.sb_record_frame, 2, 0, 1, 1)
+        self.pb_open_record = QtWidgets.QPushButton(self.widget_2)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.pb_open_record.sizePolicy().hasHeightForWidth())
+        self.pb_open_record.setSizePolicy(sizePolicy)
+        self.pb_open_record.setMaximumSize(QtCore.QSize(75, 16777215))
+        self.pb_open_record.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.pb_open_record.setObjectName("pb_open_record")
+        self.gridLayout.addWidget(self.pb_open_record, 2, 2, 1, 1)
+        self.pb_save_template = QtWidgets.QPushButton(self.widget_2)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.pb_save_template.sizePolicy().hasHeightForWidth())
+        self.pb_save_template.setSizePolicy(sizePolicy)
+        self.pb_save_template.setMaximumSize(QtCore.QSize(75, 16777215))
+        self.pb_save_template.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.pb_save_template.setObjectName("pb_save_template")
+        self.gridLayout.addWidget(self.pb_save_template, 3, 2, 1, 1)
         self.verticalLayout.addWidget(self.widget_2)
         self.widget_4 = QtWidgets.QWidget(DebugDialog)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
@@ -149,3 +174,6 @@ class Ui_DebugDialog(object):
 "区域"))
         self.lb_keywords.setText(_translate("DebugDialog", "识别关键字："))
         self.pb_test.setText(_translate("DebugDialog", "测试"))
+        self.sb_record_frame.setPrefix(_translate("DebugDialog", "录像帧："))
+        self.pb_open_record.setText(_translate("DebugDialog", "打开录像"))
+        self.pb_save_template.setText(_translate("DebugDialog", "保存模板"))
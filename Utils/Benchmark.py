@@ -0,0 +1,186 @@
+#  -*- This file benchmarks the capture and OCR preprocessing pipeline stage by stage. -*-
+"""
+用法：
+    python -m Utils.Benchmark --backend synthetic --frames 200 --output report.json
+    python -m Utils.Benchmark --backend replay --replay recordings/xxx.dbdrec --config SDargs.json
+
+分别统计截图、格式转换、裁剪、灰度、二值化各阶段的耗时分位数(p50/p95/p99)、
+内存分配次数与峰值内存，输出JSON报告，便于在同一台机器上对比不同版本。
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from Utils.CaptureBackend import CaptureBackend, create_capture_backend
+from Utils.ImageProcess import binarize, crop, frame_to_image, to_gray
+
+# 与默认配置一致的识别范围，每5个数字为 x1,y1,x2,y2,threshold
+DEFAULT_REGIONS = {
+    '匹配阶段的识别范围': [1446, 771, 1920, 1080, 120],
+    '结算页的识别范围': [56, 46, 370, 172, 70, 1712, 989, 1783, 1029, 100],
+    '断线检测的识别范围': [1319, 570, 1462, 788, 110, 469, 580, 610, 796, 120],
+    '主页面的识别范围': [203, 78, 365, 135, 120],
+}
+
+
+def load_regions(config_path: str = "") -> List[tuple]:
+    """读取识别范围
+    :param config_path: SDargs.json路径，为空时使用默认识别范围
+    :return: [(x1, y1, x2, y2, threshold), ...]"""
+    ranges = DEFAULT_REGIONS
+    if config_path:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        ranges = {key: value for key, value in config.items() if key.endswith('的识别范围')}
+
+    regions = []
+    for values in ranges.values():
+        for i in range(0, len(values) - 4, 5):
+            regions.append(tuple(values[i:i + 5]))
+    return regions
+
+
+def percentiles(samples: List[float]) -> dict:
+    """耗时分位数，单位为毫秒"""
+    if not samples:
+        return {"count": 0}
+    array = np.array(samples) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(array.mean()), 4),
+        "p50_ms": round(float(np.percentile(array, 50)), 4),
+        "p95_ms": round(float(np.percentile(array, 95)), 4),
+        "p99_ms": round(float(np.percentile(array, 99)), 4),
+        "max_ms": round(float(array.max()), 4),
+    }
+
+
+def run_pipeline(backend: CaptureBackend, regions: List[tuple], frames: int,
+                 record: Callable[[str, Callable], object]):
+    """按阶段执行截图与预处理流程
+    :param record: 执行并记录单个阶段的函数 record(阶段名, 函数) -> 返回值"""
+    for _ in range(frames):
+        frame = record("capture", backend.grab)
+        if frame is None:
+            break
+        record("convert", lambda: frame_to_image(frame))
+        for x1, y1, x2, y2, threshold in regions:
+            region = record("crop", lambda: crop(frame, x1, y1, x2, y2))
+            if not region.size:
+                continue
+            gray = record("grayscale", lambda: to_gray(region))
+            record("binarize", lambda: binarize(gray, threshold))
+
+
+def measure_latency(backend: CaptureBackend, regions: List[tuple], frames: int) -> Dict[str, dict]:
+    """耗时统计（不开启tracemalloc，避免干扰计时）"""
+    samples: Dict[str, List[float]] = {}
+
+    def record(stage, func):
+        start = time.perf_counter()
+        result = func()
+        samples.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    run_pipeline(backend, regions, frames, record)
+    return {stage: percentiles(values) for stage, values in samples.items()}
+
+
+def measure_memory(backend: CaptureBackend, regions: List[tuple], frames: int) -> Dict[str, dict]:
+    """内存分配统计：每次调用新增的分配块数、字节数以及阶段内的峰值内存"""
+    stats: Dict[str, dict] = {}
+
+    def record(stage, func):
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+        before_size, _ = tracemalloc.get_traced_memory()
+        before = tracemalloc.take_snapshot()
+        result = func()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        diff = after.compare_to(before, "filename")
+        entry = stats.setdefault(stage, {"calls": 0, "blocks": 0, "bytes": 0, "peak_bytes": 0})
+        entry["calls"] += 1
+        entry["blocks"] += sum(max(0, item.count_diff) for item in diff)
+        entry["bytes"] += sum(max(0, item.size_diff) for item in diff)
+        entry["peak_bytes"] = max(entry["peak_bytes"], peak - before_size)
+        return result
+
+    tracemalloc.start()
+    try:
+        run_pipeline(backend, regions, frames, record)
+    finally:
+        tracemalloc.stop()
+
+    for entry in stats.values():
+        calls = entry.pop("calls")
+        entry["allocations_per_call"] = round(entry.pop("blocks") / calls, 2)
+        entry["bytes_per_call"] = round(entry.pop("bytes") / calls, 1)
+    return stats
+
+
+def build_report(backend_name: str, replay_path: str, config_path: str, frames: int, memory_frames: int) -> dict:
+    regions = load_regions(config_path)
+
+    backend = create_capture_backend(backend_name, replay_path=replay_path)
+    try:
+        latency = measure_latency(backend, regions, frames)
+    finally:
+        backend.close()
+
+    backend = create_capture_backend(backend_name, replay_path=replay_path)
+    try:
+        memory = measure_memory(backend, regions, memory_frames)
+    finally:
+        backend.close()
+
+    stages = {}
+    for stage, values in latency.items():
+        stages[stage] = dict(values, **memory.get(stage, {}))
+
+    return {
+        "time": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "environment": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "backend": backend_name,
+        "replay": replay_path,
+        "frames": frames,
+        "regions": [list(region) for region in regions],
+        "stages": stages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="截图与OCR预处理流程性能测试")
+    parser.add_argument("--backend", default="synthetic", choices=["synthetic", "replay"])
+    parser.add_argument("--replay", default="", help="回放路径（PNG目录、.npz或.dbdrec）")
+    parser.add_argument("--config", default="", help="读取识别范围的SDargs.json")
+    parser.add_argument("--frames", type=int, default=200, help="计时的帧数")
+    parser.add_argument("--memory-frames", type=int, default=20, help="统计内存分配的帧数")
+    parser.add_argument("--output", default="", help="JSON报告的输出路径，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    report = build_report(args.backend, args.replay, args.config, args.frames, args.memory_frames)
+    text = json.dumps(report, indent=4, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == '__main__':
+    main()
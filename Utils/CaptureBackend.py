@@ -0,0 +1,285 @@
+#  -*- This file contains the pluggable capture backends: GDI, replay and synthetic. -*-
+
+import os
+import sys
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from Utils.FrameArchive import FrameArchiveReader
+from Utils.ImageProcess import crop
+
+
+class CaptureBackend:
+    """截图后端接口
+
+    帧统一为形状(height, width, 4)的BGRA uint8数组，区域坐标为帧坐标。"""
+
+    name = ""
+
+    def grab(self) -> Optional[np.ndarray]:
+        """截取整帧
+        :return: BGRA帧，失败时返回None；之后的截图不会改写返回的帧，可以直接跨线程保存"""
+        raise NotImplementedError
+
+    def grab_regions(self, rects) -> Optional[list]:
+        """截取多个矩形区域
+        :param rects: [(x1, y1, x2, y2), ...] 帧坐标
+        :return: 与rects一一对应的BGRA帧列表，无效区域对应None；失败时返回None"""
+        frame = self.grab()
+        if frame is None:
+            return None
+        regions = []
+        for rect in rects:
+            region = crop(frame, *rect)
+            regions.append(region if region.size else None)
+        return regions
+
+    def client_to_frame(self, x1: int, y1: int, x2: int, y2: int) -> tuple:
+        """客户区坐标转换为帧坐标"""
+        return x1, y1, x2, y2
+
+    def client_size(self) -> Optional[tuple]:
+        """客户区尺寸(width, height)，未知时返回None"""
+        return None
+
+    def available(self) -> bool:
+        """后端当前是否可以截图"""
+        return True
+
+    def close(self):
+        """释放后端持有的资源"""
+
+
+class GdiCaptureBackend(CaptureBackend):
+    """基于user32/gdi32的窗口后台截图"""
+
+    name = "gdi"
+
+    def __init__(self, hwnd_getter: Callable[[], int]):
+        """
+        :param hwnd_getter: 返回当前游戏窗口句柄的函数
+        """
+        # 仅在Windows上可用，延迟导入以便其他后端在任意平台运行
+        if sys.platform != "win32":
+            raise OSError("gdi截图后端仅在Windows上可用")
+        from Utils import background_operation
+        from Utils.Client2ScreenOperate import MouseController
+        self._background_operation = background_operation
+        self._mouse_controller = MouseController
+        self.hwnd_getter = hwnd_getter
+
+    def grab(self) -> Optional[np.ndarray]:
+        # 截图缓冲区由上下文共用，在截图锁内复制，避免其他线程的截图覆盖正在复制的帧
+        return self._background_operation.screenshot_array(self.hwnd_getter(), copy=True)
+
+    def grab_regions(self, rects) -> Optional[list]:
+        return self._background_operation.screenshot_regions(self.hwnd_getter(), rects)
+
+    def client_to_frame(self, x1: int, y1: int, x2: int, y2: int) -> tuple:
+        controller = self._mouse_controller(self.hwnd_getter())
+        screen_x1, screen_y1 = controller.client_to_screen(x1, y1)
+        screen_x2, screen_y2 = controller.client_to_screen(x2, y2)
+        return screen_x1, screen_y1, screen_x2, screen_y2
+
+    def client_size(self) -> Optional[tuple]:
+        import win32gui
+        hwnd = self.hwnd_getter()
+        if not hwnd:
+            return None
+        left, top, right, bottom = win32gui.GetClientRect(hwnd)
+        return right - left, bottom - top
+
+    def available(self) -> bool:
+        return self.hwnd_getter() != 0
+
+    def close(self):
+        self._background_operation.release_capture_contexts()
+
+
+def _rgb_to_bgra(array: np.ndarray) -> np.ndarray:
+    """RGB/RGBA数组转换为BGRA"""
+    if array.ndim == 2:
+        array = np.repeat(array[..., None], 3, axis=2)
+    height, width = array.shape[:2]
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    frame[..., 0] = array[..., 2]
+    frame[..., 1] = array[..., 1]
+    frame[..., 2] = array[..., 0]
+    frame[..., 3] = array[..., 3] if array.shape[2] == 4 else 255
+    return frame
+
+
+class ReplayCaptureBackend(CaptureBackend):
+    """回放录制的帧
+
+    支持三种来源：
+    - 目录：按文件名排序的PNG，文件名为毫秒时间戳时作为帧时间，否则按fps推算
+    - NPZ：包含frames(N, H, W, 4 BGRA或3 RGB)与可选的timestamps(N,)，单位为秒
+    - 录像文件(.dbdrec)：见Utils.FrameArchive，按需通过mmap读取
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, realtime: bool = False, loop: bool = True, fps: float = 10.0):
+        """
+        :param path: PNG目录、.npz或.dbdrec文件路径
+        :param realtime: 是否按录制时间戳的节奏回放，默认全速
+        :param loop: 播放完毕后是否从头开始
+        :param fps: PNG文件名不含时间戳时使用的帧率
+        """
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.index = 0
+        self._start = None
+        self._frames: List = []
+        self._archive = None
+        self.timestamps: List[float] = []
+
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path) if name.lower().endswith(".png"))
+            self._frames = [os.path.join(path, name) for name in names]
+            try:
+                self.timestamps = [float(os.path.splitext(name)[0]) / 1000 for name in names]
+            except ValueError:
+                self.timestamps = [i / fps for i in range(len(names))]
+        elif path.lower().endswith(".dbdrec"):
+            self._archive = FrameArchiveReader(path)
+            self._frames = list(range(len(self._archive)))
+            self.timestamps = self._archive.timestamps.tolist()
+        elif path.lower().endswith(".npz"):
+            with np.load(path) as archive:
+                frames = archive["frames"]
+                if frames.shape[-1] == 3:
+                    frames = np.stack([_rgb_to_bgra(frame) for frame in frames])
+                self._frames = list(frames)
+                if "timestamps" in archive:
+                    self.timestamps = [float(t) for t in archive["timestamps"]]
+                else:
+                    self.timestamps = [i / fps for i in range(len(self._frames))]
+        else:
+            raise ValueError(f"不支持的回放路径: {path}")
+
+        if not self._frames:
+            raise ValueError(f"回放路径中没有帧: {path}")
+
+    def __len__(self):
+        return len(self._frames)
+
+    def _load(self, index: int) -> np.ndarray:
+        if self._archive is not None:
+            return self._archive.read(index)
+        frame = self._frames[index]
+        if isinstance(frame, str):
+            with Image.open(frame) as image:
+                frame = _rgb_to_bgra(np.asarray(image.convert("RGBA")))
+        return frame
+
+    def _advance(self) -> Optional[int]:
+        """推进到下一帧，返回该帧序号；播放完毕且不循环时返回None"""
+        if self.index >= len(self._frames):
+            if not self.loop:
+                return None
+            self.index = 0
+            self._start = None
+
+        if self.realtime:
+            # 按录制节奏等待到该帧的时间点
+            if self._start is None:
+                self._start = time.perf_counter() - self.timestamps[self.index]
+            delay = self._start + self.timestamps[self.index] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        self.index += 1
+        return self.index - 1
+
+    def grab(self) -> Optional[np.ndarray]:
+        index = self._advance()
+        if index is None:
+            return None
+        return self._load(index)
+
+    def grab_regions(self, rects) -> Optional[list]:
+        if self._archive is None:
+            return super().grab_regions(rects)
+        # 录像文件只解压与识别区域重叠的分块
+        index = self._advance()
+        if index is None:
+            return None
+        regions = []
+        for rect in rects:
+            region = self._archive.read_region(index, *rect)
+            regions.append(region if region.size else None)
+        return regions
+
+    def client_size(self) -> Optional[tuple]:
+        index = min(max(self.index - 1, 0), len(self._frames) - 1)  # 最近一次读取的帧
+        if self._archive is not None:
+            return self._archive.client_size(index)
+        height, width = self._load(index).shape[:2]
+        return width, height
+
+    def seek(self, index: int):
+        """跳转到指定帧"""
+        self.index = max(0, min(index, len(self._frames)))
+        self._start = None
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+
+
+class SyntheticCaptureBackend(CaptureBackend):
+    """生成合成帧，用于无游戏环境下的性能测试"""
+
+    name = "synthetic"
+
+    def __init__(self, width: int = 1920, height: int = 1080, frame_count: int = 8, seed: int = 0):
+        """
+        :param width: 帧宽度
+        :param height: 帧高度
+        :param frame_count: 预生成并循环使用的帧数量
+        :param seed: 随机种子，保证结果可复现
+        """
+        rng = np.random.default_rng(seed)
+        gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+        self._frames = []
+        for _ in range(frame_count):
+            noise = rng.integers(0, 64, size=(height, width), dtype=np.uint8)
+            base = (gradient + noise).clip(0, 255).astype(np.uint8)
+            frame = np.empty((height, width, 4), dtype=np.uint8)
+            frame[..., 0] = base
+            frame[..., 1] = base[::-1]
+            frame[..., 2] = 255 - base
+            frame[..., 3] = 255
+            self._frames.append(frame)
+        self.index = 0
+
+    def client_size(self) -> Optional[tuple]:
+        height, width = self._frames[0].shape[:2]
+        return width, height
+
+    def grab(self) -> Optional[np.ndarray]:
+        frame = self._frames[self.index % len(self._frames)]
+        self.index += 1
+        return frame
+
+
+def create_capture_backend(name: str, hwnd_getter: Callable[[], int] = None,
+                           replay_path: str = "") -> CaptureBackend:
+    """根据配置名创建截图后端
+    :param name: gdi / replay / synthetic
+    :param hwnd_getter: gdi后端使用的窗口句柄函数
+    :param replay_path: replay后端的回放路径
+    :return: CaptureBackend"""
+    if name == "replay":
+        return ReplayCaptureBackend(replay_path)
+    if name == "synthetic":
+        return SyntheticCaptureBackend()
+    if name == "gdi":
+        return GdiCaptureBackend(hwnd_getter)
+    raise ValueError(f"未知的截图后端: {name}")
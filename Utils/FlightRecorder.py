@@ -0,0 +1,113 @@
+#  -*- This file contains the in-memory flight recorder of recent frames and OCR results. -*-
+
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+
+class FlightRecorder:
+    """在内存中保留最近若干帧（缩小并压缩）及对应的OCR结果
+
+    平时只占用固定的内存预算、不读写磁盘，仅在停留过长或断线重连时写出。"""
+
+    def __init__(self, max_frames: int = 30, max_bytes: int = 8 * 1024 * 1024, scale: int = 4):
+        """
+        :param max_frames: 最多保留的帧数
+        :param max_bytes: 压缩后帧数据的内存预算，单位为字节
+        :param scale: 缩小倍数，每scale个像素取一个
+        """
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.scale = max(1, scale)
+        self._records = deque()  # 每项为{"time", "shape", "data", "ocr"}
+        self._bytes = 0
+        self._last_frame = None
+        self._lock = threading.Lock()
+
+    def record_frame(self, frame: np.ndarray):
+        """记录一帧，同一帧对象只记录一次
+        :param frame: BGRA帧"""
+        if frame is self._last_frame:
+            return
+        self._last_frame = frame
+        self._append(np.ascontiguousarray(frame[::self.scale, ::self.scale, :3]))
+
+    def record_regions(self, rects, images: list):
+        """记录只截取了部分区域的一帧：各区域缩小后按原位置拼到缩小尺寸的黑色画布上，同一列表只记录一次
+        :param rects: [(x1, y1, x2, y2), ...] 帧坐标
+        :param images: 与rects一一对应的BGRA区域帧，无效区域为None"""
+        if images is self._last_frame:
+            return
+        placed = [(max(0, rect[0]), max(0, rect[1]), image) for rect, image in zip(rects, images) if image is not None]
+        if not placed:
+            return
+        self._last_frame = images
+        scale = self.scale
+        width = max(x + image.shape[1] for x, _, image in placed)
+        height = max(y + image.shape[0] for _, y, image in placed)
+        canvas = np.zeros((-(-height // scale), -(-width // scale), 3), dtype=np.uint8)
+        for x, y, image in placed:
+            # 与record_frame取相同的采样点，即整帧坐标为scale整数倍的像素
+            offset_x, offset_y = -x % scale, -y % scale
+            small = image[offset_y::scale, offset_x::scale, :3]
+            left, top = (x + offset_x) // scale, (y + offset_y) // scale
+            canvas[top:top + small.shape[0], left:left + small.shape[1]] = small
+        self._append(canvas)
+
+    def _append(self, small: np.ndarray):
+        """压缩并保存一帧缩小后的BGR画面"""
+        data = zlib.compress(small.tobytes(), 1)
+        with self._lock:
+            self._records.append({"time": time.time(), "shape": small.shape, "data": data, "ocr": []})
+            self._bytes += len(data)
+            # 超出帧数或内存预算时丢弃最旧的帧
+            while len(self._records) > self.max_frames or (self._bytes > self.max_bytes and len(self._records) > 1):
+                self._bytes -= len(self._records.popleft()["data"])
+
+    def record_ocr(self, label: str, threshold: int, result: str):
+        """将OCR结果附加到最近一帧"""
+        with self._lock:
+            if self._records:
+                self._records[-1]["ocr"].append({"label": label, "threshold": threshold, "result": result})
+
+    def occupancy(self) -> dict:
+        """缓冲区占用情况"""
+        with self._lock:
+            return {
+                "frames": len(self._records),
+                "max_frames": self.max_frames,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def dump(self, directory: str, reason: str) -> str:
+        """将缓冲区内的帧与OCR结果写入磁盘
+        :param directory: 输出的根目录
+        :param reason: 触发原因，用于命名子目录
+        :return: 本次输出的目录，缓冲区为空时返回空字符串"""
+        with self._lock:
+            records = list(self._records)
+        if not records:
+            return ""
+
+        output_dir = os.path.join(directory, f"{time.strftime('%Y%m%d_%H%M%S')}_{reason}")
+        os.makedirs(output_dir, exist_ok=True)
+        index = []
+        for i, record in enumerate(records):
+            file_name = f"frame_{i:03d}.png"
+            bgr = np.frombuffer(zlib.decompress(record["data"]), dtype=np.uint8).reshape(record["shape"])
+            Image.fromarray(bgr[..., ::-1]).save(os.path.join(output_dir, file_name))
+            index.append({
+                "file": file_name,
+                "time": time.strftime('%H:%M:%S', time.localtime(record["time"])) + f".{int(record['time'] * 1000) % 1000:03d}",
+                "ocr": record["ocr"],
+            })
+        with open(os.path.join(output_dir, "ocr.json"), 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=4, ensure_ascii=False)
+        return output_dir
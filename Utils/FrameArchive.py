@@ -0,0 +1,261 @@
+#  -*- This file contains the chunked, memory-mapped archive format for recorded frames. -*-
+"""
+录像文件格式（小端序）：
+
+    文件头   magic(8s) version(I) tile_size(I)
+    帧数据   每帧依次为：分块表 + 各分块的数据
+             分块表为 (偏移Q, 长度Q) 数组，偏移相对于文件开头，分块按行优先排列
+    索引     UTF-8 JSON，每帧一项：时间戳、尺寸、编码方式、分块表位置与元数据
+    文件尾   索引偏移(Q) 索引长度(Q) magic(8s)
+
+每个分块单独压缩，读取识别区域时只需解压与之重叠的分块。
+"""
+
+import json
+import mmap
+import struct
+import threading
+import time
+import zlib
+from typing import Optional
+
+import numpy as np
+
+try:
+    import zstandard  # 可选依赖，未安装时只能使用zlib/raw
+except ImportError:
+    zstandard = None
+
+MAGIC = b"DBDFRAME"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+TRAILER = struct.Struct("<QQ8s")
+TILE_ENTRY = np.dtype([("offset", "<u8"), ("length", "<u8")])
+CODECS = ("raw", "zlib", "zstd")
+
+
+class FrameArchiveWriter:
+    """写入录像文件"""
+
+    def __init__(self, path: str, codec: str = "zlib", tile_size: int = 256, level: int = 1):
+        """
+        :param path: 录像文件路径
+        :param codec: 分块编码方式 raw / zlib / zstd
+        :param tile_size: 分块边长，单位为像素
+        :param level: 压缩等级
+        """
+        if codec not in CODECS:
+            raise ValueError(f"未知的编码方式: {codec}")
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("未安装zstandard，无法使用zstd编码")
+        self.path = path
+        self.codec = codec
+        self.tile_size = tile_size
+        self.level = level
+        self._index = []
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, tile_size))
+        self._compressor = zstandard.ZstdCompressor(level=level) if codec == "zstd" else None
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zlib":
+            return zlib.compress(data, self.level)
+        if self.codec == "zstd":
+            return self._compressor.compress(data)
+        return data
+
+    def append(self, frame: np.ndarray, timestamp: Optional[float] = None, meta: Optional[dict] = None):
+        """追加一帧
+        :param frame: (height, width, channels) 的uint8数组
+        :param timestamp: 时间戳，单位为秒，默认当前时间
+        :param meta: 帧的元数据，例如阶段、OCR结果、阈值"""
+        if frame.ndim == 2:
+            frame = frame[..., None]
+        height, width, channels = frame.shape
+        tile = self.tile_size
+        rows = (height + tile - 1) // tile
+        cols = (width + tile - 1) // tile
+
+        table = np.zeros(rows * cols, dtype=TILE_ENTRY)
+        table_offset = self._file.tell()
+        self._file.write(table.tobytes())  # 先占位，写完分块后回填
+
+        for row in range(rows):
+            for col in range(cols):
+                data = self._compress(np.ascontiguousarray(
+                    frame[row * tile:(row + 1) * tile, col * tile:(col + 1) * tile]).tobytes())
+                table[row * cols + col] = (self._file.tell(), len(data))
+                self._file.write(data)
+
+        end = self._file.tell()
+        self._file.seek(table_offset)
+        self._file.write(table.tobytes())
+        self._file.seek(end)
+
+        self._index.append({
+            "t": time.time() if timestamp is None else float(timestamp),
+            "w": width,
+            "h": height,
+            "c": channels,
+            "codec": self.codec,
+            "table": table_offset,
+            "meta": meta or {},
+        })
+
+    def close(self):
+        """写入索引与文件尾"""
+        if self._file.closed:
+            return
+        index = json.dumps(self._index, ensure_ascii=False).encode("utf-8")
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(TRAILER.pack(index_offset, len(index), MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class FrameArchiveReader:
+    """通过mmap随机读取录像文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"录像文件为空: {path}")
+
+        magic, version, self.tile_size = HEADER.unpack_from(self._mmap, 0)
+        index_offset, index_length, trailer_magic = TRAILER.unpack_from(self._mmap, len(self._mmap) - TRAILER.size)
+        if magic != MAGIC or trailer_magic != MAGIC:
+            self.close()
+            raise ValueError(f"不是有效的录像文件: {path}")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"不支持的录像文件版本: {version}")
+
+        self._index = json.loads(bytes(self._mmap[index_offset:index_offset + index_length]).decode("utf-8"))
+        self.timestamps = np.array([entry["t"] for entry in self._index], dtype=np.float64)
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def __len__(self):
+        return len(self._index)
+
+    def meta(self, index: int) -> dict:
+        """帧的元数据"""
+        return self._index[index]["meta"]
+
+    def size(self, index: int) -> tuple:
+        """帧的尺寸(width, height)"""
+        entry = self._index[index]
+        return entry["w"], entry["h"]
+
+    def client_size(self, index: int) -> tuple:
+        """录制时游戏窗口客户区的尺寸(width, height)，与实时截图选择模板时使用的尺寸一致；
+        窗口化时帧（整个窗口）比客户区大。旧录像没有记录时返回帧的尺寸"""
+        size = self._index[index]["meta"].get("client_size")
+        return tuple(size) if size else self.size(index)
+
+    def index_at(self, timestamp: float) -> int:
+        """不晚于指定时间的最后一帧的序号，早于第一帧时返回0"""
+        return max(0, int(np.searchsorted(self.timestamps, timestamp, side="right")) - 1)
+
+    def _tile(self, entry: dict, table: np.ndarray, row: int, col: int, cols: int) -> np.ndarray:
+        offset, length = table[row * cols + col]
+        data = self._mmap[offset:offset + length]
+        if entry["codec"] == "zlib":
+            data = zlib.decompress(data)
+        elif entry["codec"] == "zstd":
+            if self._decompressor is None:
+                raise ValueError("未安装zstandard，无法读取zstd编码的录像")
+            data = self._decompressor.decompress(data)
+        tile = self.tile_size
+        tile_height = min(tile, entry["h"] - row * tile)
+        tile_width = min(tile, entry["w"] - col * tile)
+        return np.frombuffer(data, dtype=np.uint8).reshape(tile_height, tile_width, entry["c"])
+
+    def read_region(self, index: int, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        """读取一帧中的矩形区域，只解压与之重叠的分块
+        :return: (y2-y1, x2-x1, channels) 的uint8数组，超出帧的部分被裁掉"""
+        entry = self._index[index]
+        width, height, tile = entry["w"], entry["h"], self.tile_size
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(width, x2), min(height, y2)
+        region = np.empty((max(0, y2 - y1), max(0, x2 - x1), entry["c"]), dtype=np.uint8)
+        if region.size == 0:
+            return region
+
+        rows = (height + tile - 1) // tile
+        cols = (width + tile - 1) // tile
+        table = np.frombuffer(self._mmap, dtype=TILE_ENTRY, count=rows * cols, offset=entry["table"])
+        for row in range(y1 // tile, (y2 - 1) // tile + 1):
+            for col in range(x1 // tile, (x2 - 1) // tile + 1):
+                data = self._tile(entry, table, row, col, cols)
+                # 分块与目标区域的交集
+                top, left = row * tile, col * tile
+                ty1, ty2 = max(y1, top), min(y2, top + data.shape[0])
+                tx1, tx2 = max(x1, left), min(x2, left + data.shape[1])
+                region[ty1 - y1:ty2 - y1, tx1 - x1:tx2 - x1] = data[ty1 - top:ty2 - top, tx1 - left:tx2 - left]
+        return region
+
+    def read(self, index: int) -> np.ndarray:
+        """读取整帧"""
+        entry = self._index[index]
+        return self.read_region(index, 0, 0, entry["w"], entry["h"])
+
+    def read_at(self, timestamp: float) -> np.ndarray:
+        """读取不晚于指定时间的最后一帧"""
+        return self.read(self.index_at(timestamp))
+
+    def close(self):
+        if not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class FrameArchiveRecorder:
+    """运行时录制：把检测用的帧连同阶段和OCR结果写入录像文件
+
+    OCR结果在帧截取之后才产生，因此每帧在下一帧到来（或关闭）时才写入。"""
+
+    def __init__(self, path: str, codec: str = "zlib"):
+        self.writer = FrameArchiveWriter(path, codec=codec)
+        self._pending = None  # (帧, 时间戳, 元数据)
+        self._lock = threading.Lock()
+
+    def record_frame(self, frame: np.ndarray, meta: Optional[dict] = None):
+        """记录一帧，同一帧对象只记录一次"""
+        with self._lock:
+            if self._pending is not None and frame is self._pending[0]:
+                return
+            self._flush()
+            self._pending = (frame, time.time(), dict(meta or {}, ocr=[]))
+
+    def record_ocr(self, label: str, threshold: int, result: str):
+        """将OCR结果附加到当前帧"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending[2]["ocr"].append({"label": label, "threshold": threshold, "result": result})
+
+    def _flush(self):
+        if self._pending is not None:
+            frame, timestamp, meta = self._pending
+            self.writer.append(frame, timestamp, meta)
+            self._pending = None
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self.writer.close()
@@ -0,0 +1,197 @@
+#  -*- This file contains the shared frame cache used by the detectors. -*-
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+
+from Utils.ImageProcess import crop
+
+
+class FrameCache:
+    """在有效期内让所有检测共用同一帧截图
+
+    缓存截图来源（窗口句柄）的整个客户区画面，get_regions从中裁剪各区域，
+    因此请求不同区域组合的检测在有效期内也只截图一次。
+    每次重新截图时代号(generation)加一，命中/未命中次数用于统计节省的截图次数。"""
+
+    def __init__(self, capture_func: Callable[[], Optional[np.ndarray]], max_age: float = 0.15,
+                 source_func: Optional[Callable[[], object]] = None):
+        """
+        :param capture_func: 截取整帧的函数，返回之后不会被改写的BGRA帧（见CaptureBackend.grab），失败时返回None
+        :param max_age: 帧的有效期，单位为秒，小于等于0时每次都重新截图
+        :param source_func: 返回当前截图来源（如窗口句柄）的函数，来源变化时缓存的帧立即失效
+        """
+        self.capture_func = capture_func
+        self.source_func = source_func
+        self.max_age = max_age
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._frame = None
+        self._frame_generation = 0
+        self._source = None
+        self._timestamp = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def last_generation(self) -> int:
+        """当前线程最近一次get/get_regions返回的帧代号，代号相同即为同一次截图"""
+        return getattr(self._local, "generation", 0)
+
+    def get(self) -> Optional[np.ndarray]:
+        """获取有效期内的帧，过期或截图来源变化则重新截图
+        :return: BGRA帧，截图失败时返回None"""
+        source = self.source_func() if self.source_func is not None else None
+        with self._lock:
+            now = time.perf_counter()
+            if self._frame is not None and source == self._source and now - self._timestamp <= self.max_age:
+                self.hits += 1
+                self._local.generation = self._frame_generation
+                return self._frame
+
+            self.misses += 1
+            frame = self.capture_func()
+            if frame is None:
+                self._frame = None
+                return None
+            # 截图后端返回的帧不会被之后的截图改写（GDI后端在截图锁内复制），无需再复制
+            self._frame = frame
+            self._source = source
+            self._timestamp = now
+            self.generation += 1
+            self._frame_generation = self._local.generation = self.generation
+            return self._frame
+
+    def get_regions(self, rects) -> Optional[list]:
+        """从有效期内的帧中裁剪多个矩形区域
+        :param rects: [(x1, y1, x2, y2), ...] 帧坐标
+        :return: 与rects一一对应的区域帧列表（缓存帧上的视图），无效区域对应None；截图失败时返回None"""
+        frame = self.get()
+        if frame is None:
+            return None
+        regions = []
+        for rect in rects:
+            region = crop(frame, *rect)
+            regions.append(region if region.size else None)
+        return regions
+
+    def stats(self) -> dict:
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class CaptureThread(threading.Thread):
+    """后台截图线程
+
+    按设定帧率截图并写入环形缓冲区，检测时直接取最新帧而不阻塞，
+    使截图与OCR并行进行。"""
+
+    def __init__(self, capture_func: Callable[[], Optional[np.ndarray]], fps: float = 10.0, size: int = 3):
+        """
+        :param capture_func: 截取整帧的函数，返回之后不会被改写的BGRA帧（见CaptureBackend.grab），失败时返回None
+        :param fps: 目标帧率
+        :param size: 环形缓冲区的帧数
+        """
+        super().__init__(daemon=True)
+        self.capture_func = capture_func
+        self.interval = 1.0 / fps
+        self._ring = deque(maxlen=size)  # (序号, 时间戳, 帧)
+        self._capture_times = deque(maxlen=30)
+        self._lock = threading.Lock()
+        self._running = True
+        self._sequence = 0
+        self._last_consumed = 0
+        self._local = threading.local()
+        self.captured = 0
+        self.dropped = 0  # 从未被取用的帧数
+        self.failures = 0
+        self.stale = 0  # 因最新帧过期而未取用的次数
+        self.last_age = 0.0  # 最近一次取帧时帧的年龄，单位为秒
+        self._age_total = 0.0
+        self._consumed = 0
+
+    def run(self):
+        next_time = time.perf_counter()
+        while self._running:
+            try:
+                frame = self.capture_func()
+            except Exception:
+                frame = None
+            now = time.perf_counter()
+            if frame is None:
+                self.failures += 1
+            else:
+                with self._lock:
+                    self._sequence += 1
+                    self._ring.append((self._sequence, now, frame))
+                    self._capture_times.append(now)
+                    self.captured += 1
+
+            next_time += self.interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # 截图耗时超过间隔，从当前时间重新计时
+                next_time = time.perf_counter()
+
+    @property
+    def last_sequence(self) -> int:
+        """当前线程最近一次latest返回的帧序号"""
+        return getattr(self._local, "sequence", 0)
+
+    def latest(self, max_age: Optional[float] = None) -> Optional[np.ndarray]:
+        """取最新一帧，不等待
+        :param max_age: 帧的最大年龄，单位为秒；线程卡住或持续截图失败时最新帧可能已过期，为None时不限制
+        :return: BGRA帧，尚无帧或最新帧已过期时返回None"""
+        with self._lock:
+            if not self._ring:
+                return None
+            sequence, timestamp, frame = self._ring[-1]
+            if max_age is not None and time.perf_counter() - timestamp > max_age:
+                self.stale += 1
+                return None
+            if sequence > self._last_consumed:
+                # 两次取帧之间产生但从未被取用的帧
+                self.dropped += sequence - self._last_consumed - 1
+                self._last_consumed = sequence
+            self._local.sequence = sequence
+            self.last_age = time.perf_counter() - timestamp
+            self._age_total += self.last_age
+            self._consumed += 1
+            return frame
+
+    def stop(self):
+        """停止截图线程"""
+        self._running = False
+
+    def stats(self) -> dict:
+        """帧率、丢帧与帧年龄统计"""
+        with self._lock:
+            times = self._capture_times
+            fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+            return {
+                "fps": round(fps, 2),
+                "captured": self.captured,
+                "dropped": self.dropped,
+                "failures": self.failures,
+                "stale": self.stale,
+                "last_age_ms": round(self.last_age * 1000, 1),
+                "mean_age_ms": round(self._age_total / self._consumed * 1000, 1) if self._consumed else 0.0,
+            }
@@ -0,0 +1,164 @@
+#  -*- This file contains the NumPy helpers used to preprocess captured frames. -*-
+
+import numpy as np
+from PIL import Image
+
+
+def frame_from_buffer(buffer, width: int, height: int) -> np.ndarray:
+    """将GetDIBits缓冲区包装为BGRA帧，不复制数据
+    :param buffer: ctypes缓冲区或任何支持缓冲区协议的对象
+    :param width: 宽度
+    :param height: 高度
+    :return: 形状为(height, width, 4)的uint8视图"""
+    return np.frombuffer(buffer, dtype=np.uint8, count=width * height * 4).reshape(height, width, 4)
+
+
+def frame_to_image(frame: np.ndarray) -> Image:
+    """BGRA帧转换为PIL.Image（兼容旧接口）
+    :param frame: BGRA帧
+    :return: RGB Image"""
+    height, width = frame.shape[:2]
+    return Image.frombuffer("RGB", (width, height), np.ascontiguousarray(frame), "raw", "BGRX", 0, 1)
+
+
+def crop(frame: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+    """按区域裁剪，返回视图
+    :return: 裁剪后的帧，不复制数据"""
+    return frame[max(0, y1):y2, max(0, x1):x2]
+
+
+def to_gray(frame: np.ndarray) -> np.ndarray:
+    """BGRA帧转灰度，与PIL的convert('L')取整方式一致
+    :return: uint8灰度图"""
+    b = frame[..., 0].astype(np.uint32)
+    g = frame[..., 1].astype(np.uint32)
+    r = frame[..., 2].astype(np.uint32)
+    return ((r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16).astype(np.uint8)
+
+
+def binarize(gray: np.ndarray, threshold: int) -> np.ndarray:
+    """二值化，大于阈值为255，否则为0
+    :return: uint8二值图"""
+    return np.where(gray > threshold, np.uint8(255), np.uint8(0))
+
+
+def binarize_stack(gray: np.ndarray, thresholds) -> np.ndarray:
+    """一次比较生成多个阈值的二值图，每个阈值的规则与binarize相同
+    :param gray: uint8灰度图
+    :param thresholds: 阈值序列
+    :return: 形状为(len(thresholds), height, width)的uint8二值图，masks[i]对应thresholds[i]"""
+    levels = np.asarray(thresholds, dtype=np.int16).reshape(-1, 1, 1)
+    if levels.min() >= 0 and levels.max() <= 255:
+        levels = levels.astype(np.uint8)  # 与灰度图同类型比较，避免整图提升为int16
+    masks = np.greater(gray, levels).view(np.uint8)  # bool与uint8同宽，直接视为0/1
+    masks *= 255
+    return masks
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Otsu法求使类间方差最大的阈值，与binarize配合使用（大于阈值为255）
+    :return: 0~255的阈值"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight = np.cumsum(histogram)  # 灰度不高于t的像素数
+    total_weight = weight[-1]
+    cumulative_mean = np.cumsum(histogram * levels)
+    total_mean = cumulative_mean[-1]
+    background = weight[:-1]
+    foreground = total_weight - background
+    valid = (background > 0) & (foreground > 0)
+    if not valid.any():
+        return int(gray.flat[0]) if gray.size else 0
+    between = np.zeros(255)
+    between[valid] = (total_mean * background[valid] - total_weight * cumulative_mean[:-1][valid]) ** 2 \
+        / (background[valid] * foreground[valid])
+    return int(np.argmax(between))
+
+
+def sauvola(gray: np.ndarray, window: int = 31, k: float = 0.2, r: float = 128) -> np.ndarray:
+    """Sauvola局部自适应二值化，每个像素与其邻域的均值、标准差得到的阈值比较
+    :param window: 邻域边长，单位为像素
+    :param k: 标准差的权重
+    :param r: 标准差的动态范围
+    :return: uint8二值图，大于局部阈值为255"""
+    height, width = gray.shape
+    half = window // 2
+    pixels = gray.astype(np.float64)
+    padded = np.pad(pixels, half + 1, mode="reflect")[:height + window, :width + window]
+    sums = np.cumsum(np.cumsum(padded, axis=0), axis=1)
+    square_sums = np.cumsum(np.cumsum(np.square(padded), axis=0), axis=1)
+
+    def box(table):
+        return (table[window:, window:] - table[:-window, window:]
+                - table[window:, :-window] + table[:-window, :-window])
+
+    count = window * window
+    mean = box(sums) / count
+    std = np.sqrt(np.maximum(box(square_sums) / count - np.square(mean), 0))
+    threshold = mean * (1 + k * (std / r - 1))
+    return np.where(pixels > threshold, np.uint8(255), np.uint8(0))
+
+
+THRESHOLD_STRATEGIES = ("fixed", "otsu", "sauvola", "otsu_search")
+
+
+def threshold_masks(gray: np.ndarray, strategy: str, threshold: int, step: int = 10, span: int = 2) -> np.ndarray:
+    """按阈值策略生成二值图
+    :param strategy: fixed 固定阈值 / otsu Otsu阈值 / sauvola 局部自适应 /
+                     otsu_search Otsu阈值及其两侧±step、±2*step…的阈值
+    :param threshold: fixed策略使用的阈值
+    :param step: otsu_search的阈值间隔
+    :param span: otsu_search在Otsu阈值每侧搜索的个数
+    :return: 形状为(N, height, width)的二值图，masks[0]为首选结果"""
+    if strategy == "otsu":
+        return binarize_stack(gray, [otsu_threshold(gray)])
+    if strategy == "sauvola":
+        return sauvola(gray)[None]
+    if strategy == "otsu_search":
+        center = otsu_threshold(gray)
+        thresholds = [center]
+        for i in range(1, span + 1):
+            thresholds += [center - i * step, center + i * step]
+        return binarize_stack(gray, [t for t in thresholds if 0 <= t <= 255])
+    if strategy == "fixed":
+        return binarize_stack(gray, [threshold])
+    raise ValueError(f"未知的阈值策略: {strategy}")
+
+
+def mask_to_image(mask: np.ndarray) -> Image:
+    """二值图转换为PIL.Image，供OCR引擎使用
+    :return: 'L'模式Image"""
+    return Image.fromarray(mask, "L")
+
+
+def build_mosaic(masks: list, padding: int = 16) -> tuple:
+    """把多个二值图纵向拼接为一张图，供一次OCR识别
+
+    每个区域统一为白底（背景为黑的区域会被反色），四周留白以免相邻区域被识别为同一行。
+    :param masks: uint8二值图列表
+    :param padding: 区域四周的留白，单位为像素
+    :return: (拼接图, [(起始行, 结束行), ...]) 后者为每个区域在拼接图中所占的行范围（含留白）"""
+    width = max(mask.shape[1] for mask in masks) + padding * 2
+    height = sum(mask.shape[0] + padding * 2 for mask in masks)
+    mosaic = np.full((height, width), 255, dtype=np.uint8)
+    spans = []
+    top = 0
+    for mask in masks:
+        border = np.concatenate((mask[0], mask[-1], mask[:, 0], mask[:, -1]))
+        if border.mean() < 128:
+            mask = 255 - mask  # 黑底白字转为白底黑字
+        mask_height, mask_width = mask.shape
+        mosaic[top + padding:top + padding + mask_height, padding:padding + mask_width] = mask
+        spans.append((top, top + mask_height + padding * 2))
+        top += mask_height + padding * 2
+    return mosaic, spans
+
+
+def resize(gray: np.ndarray, scale: float) -> np.ndarray:
+    """按倍数缩放灰度图（双线性插值）
+    :return: uint8灰度图，scale为1时原样返回"""
+    if scale == 1:
+        return gray
+    height, width = gray.shape
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return np.asarray(Image.fromarray(gray, "L").resize(size, Image.BILINEAR))
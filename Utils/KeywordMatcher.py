@@ -0,0 +1,139 @@
+#  -*- This file contains the precompiled keyword matcher that tolerates OCR misreads. -*-
+"""
+关键字与识别结果先做同样的归一化（全角转半角、繁体转简体、去除空白），
+再用Aho-Corasick自动机一次扫描识别结果。
+
+允许k个编辑错误的关键字被分成k+1段放入自动机：错误不超过k个时至少有一段原样出现
+（鸽巢原理）。任一段命中后，只在其附近计算关键字与识别结果子串的最小编辑距离。
+"""
+
+import functools
+import unicodedata
+from collections import deque
+from typing import Iterable, List, NamedTuple, Optional
+
+# 常见繁体字与对应的简体字，逐字对应
+_TRADITIONAL = ("開遊戲準備緒關閉繼續結賽計爾們來這個說時會過還對後麼與當從於進現點動實經發體問題學國長門間"
+                "機電車東語頭見親應記設認請讓談讀變寫號畫書興選擇殺藥網絡連線斷錯誤碼載確帳戶獲勝敗離隊員級"
+                "獎勵豐強獸獵倖鬥務傳輸贏幣積鑰彈聯顯數據資訊幫謝錄標儲專屬區內處異範圍權臺灣週裡嗎邊氣紅藍"
+                "綠黃紀歷終極屆優質創報導廣場圖鐘鍵盤護衛醫療傷虛擬覽嚴舊歡總筆紙壓風險麗戰陣營禮贈購買賣價"
+                "獻貢狀態階儀錶擊練習隨腳釋轉換業團戀愛廳單雙層類")
+_SIMPLIFIED = ("开游戏准备绪关闭继续结赛计尔们来这个说时会过还对后么与当从于进现点动实经发体问题学国长门间"
+               "机电车东语头见亲应记设认请让谈读变写号画书兴选择杀药网络连线断错误码载确账户获胜败离队员级"
+               "奖励丰强兽猎幸斗务传输赢币积钥弹联显数据资讯帮谢录标储专属区内处异范围权台湾周里吗边气红蓝"
+               "绿黄纪历终极届优质创报导广场图钟键盘护卫医疗伤虚拟览严旧欢总笔纸压风险丽战阵营礼赠购买卖价"
+               "献贡状态阶仪表击练习随脚释转换业团恋爱厅单双层类")
+_TO_SIMPLIFIED = str.maketrans(_TRADITIONAL, _SIMPLIFIED)
+
+
+def normalize(text: str) -> str:
+    """全角转半角、繁体转简体并去除空白，不改变英文大小写"""
+    text = unicodedata.normalize("NFKC", text).translate(_TO_SIMPLIFIED)
+    return "".join(text.split())
+
+
+def edit_distance_in(pattern: str, text: str) -> int:
+    """pattern与text任一子串之间的最小编辑距离"""
+    previous = [0] * (len(text) + 1)
+    for i, char in enumerate(pattern, 1):
+        current = [i] + [0] * len(text)
+        for j, other in enumerate(text, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+        previous = current
+    return min(previous)
+
+
+class KeywordMatch(NamedTuple):
+    keyword: str  # 配置中的关键字
+    similarity: float  # 1 - 编辑距离 / 关键字长度
+
+
+class KeywordMatcher:
+    """一组关键字编译成的匹配器"""
+
+    def __init__(self, keywords: Iterable[str], max_error_ratio: float = 0.25):
+        """
+        :param keywords: 关键字
+        :param max_error_ratio: 允许的编辑距离占关键字长度的比例（向下取整）
+        """
+        self.keywords: List[str] = []
+        self._normalized: List[str] = []
+        self._max_edits: List[int] = []
+        self._goto = [{}]  # 状态 -> {字符: 下一状态}
+        self._fail = [0]
+        self._output = [[]]  # 状态 -> [(关键字序号, 段在关键字中的结束位置), ...]
+
+        for keyword in keywords:
+            normalized = normalize(str(keyword))
+            if not normalized:
+                continue
+            index = len(self.keywords)
+            self.keywords.append(str(keyword))
+            self._normalized.append(normalized)
+            max_edits = min(int(len(normalized) * max_error_ratio), len(normalized) - 1)
+            self._max_edits.append(max_edits)
+            # 分成max_edits + 1段
+            pieces = max_edits + 1
+            bounds = [len(normalized) * part // pieces for part in range(pieces + 1)]
+            for start, end in zip(bounds, bounds[1:]):
+                self._insert(normalized[start:end], (index, end))
+        self._build_fail()
+
+    def _insert(self, piece: str, output: tuple):
+        state = 0
+        for char in piece:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(output)
+
+    def _build_fail(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """识别结果中出现的所有关键字，按相似度从高到低排列"""
+        text = normalize(text)
+        best = {}  # 关键字序号 -> 编辑距离
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for index, piece_end in self._output[state]:
+                if best.get(index) == 0:
+                    continue
+                keyword, max_edits = self._normalized[index], self._max_edits[index]
+                # 关键字在识别结果中的大致起点，前后各留max_edits个字符的余量
+                start = position + 1 - piece_end
+                window = text[max(0, start - max_edits):start + len(keyword) + max_edits]
+                distance = 0 if max_edits == 0 else edit_distance_in(keyword, window)
+                if distance <= max_edits and distance < best.get(index, max_edits + 1):
+                    best[index] = distance
+        matches = [KeywordMatch(self.keywords[index], 1 - distance / len(self._normalized[index]))
+                   for index, distance in best.items()]
+        return sorted(matches, key=lambda match: match.similarity, reverse=True)
+
+    def search(self, text: str) -> Optional[KeywordMatch]:
+        """相似度最高的关键字，没有时返回None"""
+        matches = self.find_all(text)
+        return matches[0] if matches else None
+
+
+@functools.lru_cache(maxsize=64)
+def compile_keywords(keywords: tuple, max_error_ratio: float = 0.25) -> KeywordMatcher:
+    """编译关键字，相同的关键字组合只编译一次（配置修改后自动重新编译）"""
+    return KeywordMatcher(keywords, max_error_ratio)
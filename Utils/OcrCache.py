@@ -0,0 +1,88 @@
+#  -*- This file contains the bounded LRU cache of OCR results keyed by binarized region content. -*-
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+class OcrResultCache:
+    """按二值图内容缓存OCR结果
+
+    键为(二值图内容的哈希, 尺寸, 语言, 识别参数)，同一画面反复出现时（开始按钮、准备按钮、
+    空白的结算区域等）无需再次调用tesseract。超出容量时淘汰最久未使用的项。"""
+
+    def __init__(self, max_entries: int = 256):
+        """
+        :param max_entries: 最多缓存的结果数，为0时不缓存
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> OCR结果
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(mask: np.ndarray, lang: str, config: str) -> tuple:
+        """计算缓存键，直接对二值图的内存做哈希，不复制数据"""
+        digest = hashlib.blake2b(np.ascontiguousarray(mask).data, digest_size=16).digest()
+        return digest, mask.shape, lang, config
+
+    @staticmethod
+    def _entry_size(key: tuple, result: str) -> int:
+        return sys.getsizeof(key[0]) + sys.getsizeof(result)
+
+    def get(self, key: tuple) -> Optional[str]:
+        """查询缓存
+        :return: 缓存的OCR结果，未命中时返回None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return result
+
+    def put(self, key: tuple, result: str):
+        """写入缓存，超出容量时淘汰最久未使用的项"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= self._entry_size(key, previous)
+            self._entries[key] = result
+            self._bytes += self._entry_size(key, result)
+            while len(self._entries) > self.max_entries:
+                old_key, old_result = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(old_key, old_result)
+                self._evictions += 1
+
+    def stats(self) -> dict:
+        """命中率、占用内存（估算）与淘汰次数"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0,
+                "evictions": self._evictions,
+                "bytes": self._bytes,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = self._misses = self._evictions = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
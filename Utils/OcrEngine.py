@@ -0,0 +1,617 @@
+#  -*- This file contains the OCR engines: in-process libtesseract and the tesseract CLI fallback. -*-
+
+import ctypes
+import multiprocessing
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class OcrError(Exception):
+    """OCR识别失败"""
+
+
+def parse_config(config: str) -> Tuple[int, int, Dict[str, str]]:
+    """解析tesseract命令行风格的配置
+    :param config: 例如 '--oem 3 --psm 6 -c tessedit_char_whitelist=abc'
+    :return: (oem, psm, 变量字典)"""
+    oem, psm, variables = 3, 3, {}
+    tokens = shlex.split(config)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "--oem" and i + 1 < len(tokens):
+            oem = int(tokens[i + 1])
+            i += 1
+        elif token == "--psm" and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 1
+        elif token == "-c" and i + 1 < len(tokens) and "=" in tokens[i + 1]:
+            key, value = tokens[i + 1].split("=", 1)
+            variables[key] = value
+            i += 1
+        i += 1
+    return oem, psm, variables
+
+
+class OcrEngine:
+    """OCR引擎接口，输入为uint8灰度/二值图"""
+
+    name = ""
+
+    def image_to_string(self, mask: np.ndarray, lang: str, config: str) -> str:
+        """识别文字
+        :return: 识别结果原文"""
+        raise NotImplementedError
+
+    def image_to_data(self, mask: np.ndarray, lang: str, config: str) -> Dict[str, List]:
+        """识别单词及其位置
+        :return: 与pytesseract.Output.DICT相同结构的字典：页、块、段、行、单词（level 1~5）各占一行，
+                 非单词行的text为空、conf为-1，因此空白画面也至少有页一行"""
+        raise NotImplementedError
+
+    def close(self):
+        """释放引擎资源"""
+
+
+def encode_pbm(mask: np.ndarray) -> bytes:
+    """二值图编码为PBM(P4)，不压缩、无损
+
+    mask中为0的像素作为黑色，其余为白色。"""
+    height, width = mask.shape[:2]
+    bits = np.packbits(np.asarray(mask) == 0, axis=1)  # 每行按字节补齐，与P4格式一致
+    return b"P4\n%d %d\n" % (width, height) + bits.tobytes()
+
+
+DATA_KEYS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+             "left", "top", "width", "height", "conf", "text")  # tsv输出的列
+
+
+def parse_tsv(tsv: str) -> Dict[str, List]:
+    """解析tesseract的tsv输出
+    :return: 与pytesseract.Output.DICT相同结构的字典"""
+    lines = tsv.splitlines()
+    if not lines:
+        return {key: [] for key in DATA_KEYS}
+    keys = lines[0].split("\t")
+    data = {key: [] for key in keys}
+    for line in lines[1:]:
+        values = line.split("\t")
+        if len(values) < len(keys) - 1:
+            continue
+        values += [""] * (len(keys) - len(values))  # 没有文字的行缺少最后一列
+        for key, value in zip(keys, values):
+            if key == "text":
+                data[key].append(value)
+            elif key == "conf":
+                data[key].append(float(value))
+            else:
+                data[key].append(int(value))
+    return data
+
+
+def split_by_rows(data: Dict[str, List], spans: List[Tuple[int, int]]) -> List[str]:
+    """把拼接图的识别结果按行范围分配回各区域
+    :param data: image_to_data的结果
+    :param spans: build_mosaic返回的每个区域的行范围
+    :return: 每个区域的文字，按识别顺序拼接且不含空白"""
+    texts = [[] for _ in spans]
+    for i, text in enumerate(data.get("text", [])):
+        text = str(text).strip()
+        if not text:
+            continue
+        center = data["top"][i] + data["height"][i] / 2
+        for index, (top, bottom) in enumerate(spans):
+            if top <= center < bottom:
+                texts[index].append(text)
+                break
+    return ["".join("".join(words).split()) for words in texts]
+
+
+class CliOcrEngine(OcrEngine):
+    """每次调用启动一次tesseract.exe，图像以PBM格式经标准输入传入，结果从标准输出读取"""
+
+    name = "cli"
+
+    def __init__(self, tesseract_cmd: str = "tesseract"):
+        """
+        :param tesseract_cmd: tesseract可执行文件路径
+        """
+        self.tesseract_cmd = tesseract_cmd or "tesseract"
+
+    def _run(self, mask: np.ndarray, lang: str, config: str, output_format: str = "") -> str:
+        command = [self.tesseract_cmd, "stdin", "stdout", "-l", lang] + shlex.split(config)
+        if output_format:
+            command.append(output_format)
+        try:
+            process = subprocess.run(command, input=encode_pbm(mask), capture_output=True,
+                                     creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        except OSError as e:
+            raise OcrError(f"无法启动tesseract: {e}")
+        if process.returncode != 0:
+            raise OcrError(process.stderr.decode("utf-8", errors="ignore").strip())
+        return process.stdout.decode("utf-8", errors="ignore")
+
+    def image_to_string(self, mask: np.ndarray, lang: str, config: str) -> str:
+        return self._run(mask, lang, config)
+
+    def image_to_data(self, mask: np.ndarray, lang: str, config: str) -> Dict[str, List]:
+        return parse_tsv(self._run(mask, lang, config, "tsv"))
+
+
+# libtesseract 的常见文件名
+LIBTESSERACT_NAMES = {
+    "win32": ["libtesseract-5.dll", "libtesseract-4.dll", "tesseract53.dll", "tesseract50.dll", "tesseract41.dll"],
+    "darwin": ["libtesseract.5.dylib", "libtesseract.4.dylib", "libtesseract.dylib"],
+    "linux": ["libtesseract.so.5", "libtesseract.so.4", "libtesseract.so"],
+}
+
+# PageIteratorLevel，对应tsv输出中的level 2~5
+RIL_BLOCK, RIL_PARA, RIL_TEXTLINE, RIL_WORD = 0, 1, 2, 3
+
+
+def load_libtesseract(directory: str = "") -> ctypes.CDLL:
+    """加载libtesseract并声明所用C API的签名
+    :param directory: tesseract安装目录，为空时按系统搜索路径加载
+    :return: ctypes.CDLL"""
+    platform_key = "win32" if sys.platform == "win32" else "darwin" if sys.platform == "darwin" else "linux"
+    if directory and sys.platform == "win32" and os.path.isdir(directory):
+        os.add_dll_directory(directory)  # 依赖的DLL与libtesseract在同一目录
+
+    lib = None
+    errors = []
+    for name in LIBTESSERACT_NAMES[platform_key]:
+        path = os.path.join(directory, name) if directory else name
+        try:
+            lib = ctypes.CDLL(path)
+            break
+        except OSError as e:
+            errors.append(str(e))
+    if lib is None:
+        raise OSError(f"未找到libtesseract: {'; '.join(errors)}")
+
+    c_void_p, c_char_p, c_int = ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int
+    signatures = {
+        "TessBaseAPICreate": (c_void_p, []),
+        "TessBaseAPIDelete": (None, [c_void_p]),
+        "TessBaseAPIEnd": (None, [c_void_p]),
+        "TessBaseAPIInit2": (c_int, [c_void_p, c_char_p, c_char_p, c_int]),
+        "TessBaseAPISetVariable": (c_int, [c_void_p, c_char_p, c_char_p]),
+        "TessBaseAPIGetStringVariable": (c_char_p, [c_void_p, c_char_p]),
+        "TessBaseAPISetPageSegMode": (None, [c_void_p, c_int]),
+        "TessBaseAPISetImage": (None, [c_void_p, c_void_p, c_int, c_int, c_int, c_int]),
+        "TessBaseAPIRecognize": (c_int, [c_void_p, c_void_p]),
+        "TessBaseAPIGetUTF8Text": (c_void_p, [c_void_p]),
+        "TessBaseAPIGetIterator": (c_void_p, [c_void_p]),
+        "TessBaseAPIClear": (None, [c_void_p]),
+        "TessDeleteText": (None, [c_void_p]),
+        "TessResultIteratorDelete": (None, [c_void_p]),
+        "TessResultIteratorNext": (c_int, [c_void_p, c_int]),
+        "TessResultIteratorGetUTF8Text": (c_void_p, [c_void_p, c_int]),
+        "TessResultIteratorConfidence": (ctypes.c_float, [c_void_p, c_int]),
+        "TessResultIteratorGetPageIterator": (c_void_p, [c_void_p]),
+        "TessPageIteratorBoundingBox": (c_int, [c_void_p, c_int] + [ctypes.POINTER(c_int)] * 4),
+        "TessPageIteratorIsAtBeginningOf": (c_int, [c_void_p, c_int]),
+    }
+    for func_name, (restype, argtypes) in signatures.items():
+        func = getattr(lib, func_name)
+        func.restype = restype
+        func.argtypes = argtypes
+    return lib
+
+
+class CapiOcrEngine(OcrEngine):
+    """通过ctypes在进程内调用libtesseract
+
+    每个线程、每种(语言, oem)组合各保留一个已初始化的TessBaseAPI，
+    traineddata只在首次使用时加载一次。"""
+
+    name = "capi"
+
+    def __init__(self, tesseract_dir: str = "", tessdata_dir: str = ""):
+        """
+        :param tesseract_dir: libtesseract所在目录
+        :param tessdata_dir: traineddata所在目录，为空时使用TESSDATA_PREFIX
+        """
+        self.lib = load_libtesseract(tesseract_dir)
+        self.tessdata_dir = tessdata_dir or os.environ.get("TESSDATA_PREFIX", "")
+        self._local = threading.local()
+        self._handles = []  # 所有线程创建的句柄，退出时统一释放
+        self._lock = threading.Lock()
+
+    def _api(self, lang: str, oem: int) -> int:
+        """获取当前线程的TessBaseAPI，首次使用时初始化"""
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+        handle = apis.get((lang, oem))
+        if handle is None:
+            handle = self.lib.TessBaseAPICreate()
+            datapath = self.tessdata_dir.encode("utf-8") if self.tessdata_dir else None
+            if self.lib.TessBaseAPIInit2(handle, datapath, lang.encode("utf-8"), oem) != 0:
+                self.lib.TessBaseAPIDelete(handle)
+                raise OcrError(f"libtesseract初始化失败: lang={lang}, oem={oem}")
+            apis[(lang, oem)] = handle
+            with self._lock:
+                self._handles.append(handle)
+        return handle
+
+    def _apply_variables(self, handle: int, variables: Dict[str, str]):
+        """设置本次识别的变量，上次设置而本次未设置的变量恢复为默认值
+
+        同一句柄在不同配置间复用，避免为每种字符白名单各加载一次traineddata。"""
+        applied = getattr(self._local, "variables", None)
+        if applied is None:
+            applied = self._local.variables = {}
+        current = applied.setdefault(handle, {})  # 变量名 -> (默认值, 当前值)
+        for name in list(current):
+            if name not in variables:
+                default, _ = current.pop(name)
+                self.lib.TessBaseAPISetVariable(handle, name.encode("utf-8"), default.encode("utf-8"))
+        for name, value in variables.items():
+            if name in current and current[name][1] == value:
+                continue
+            if name not in current:
+                pointer = self.lib.TessBaseAPIGetStringVariable(handle, name.encode("utf-8"))
+                default = pointer.decode("utf-8") if pointer else ""
+            else:
+                default = current[name][0]
+            if not self.lib.TessBaseAPISetVariable(handle, name.encode("utf-8"), value.encode("utf-8")):
+                raise OcrError(f"无效的tesseract变量: {name}")
+            current[name] = (default, value)
+
+    def _prepare(self, mask: np.ndarray, lang: str, config: str) -> Tuple[int, np.ndarray]:
+        """设置识别参数与图像，返回(句柄, 需在识别期间保持存活的图像)"""
+        oem, psm, variables = parse_config(config)
+        handle = self._api(lang, oem)
+        self._apply_variables(handle, variables)
+        self.lib.TessBaseAPISetPageSegMode(handle, psm)
+        image = np.ascontiguousarray(mask, dtype=np.uint8)
+        height, width = image.shape[:2]
+        self.lib.TessBaseAPISetImage(handle, image.ctypes.data, width, height, 1, image.strides[0])
+        return handle, image
+
+    def _take_text(self, pointer: Optional[int]) -> str:
+        """读取并释放tesseract返回的字符串"""
+        if not pointer:
+            return ""
+        try:
+            return ctypes.string_at(pointer).decode("utf-8", errors="ignore")
+        finally:
+            self.lib.TessDeleteText(pointer)
+
+    def image_to_string(self, mask: np.ndarray, lang: str, config: str) -> str:
+        handle, image = self._prepare(mask, lang, config)
+        try:
+            return self._take_text(self.lib.TessBaseAPIGetUTF8Text(handle))
+        finally:
+            self.lib.TessBaseAPIClear(handle)
+
+    @staticmethod
+    def _append_row(data: Dict[str, List], level: int, numbers: List[int], box: Tuple[int, int, int, int],
+                    conf: float, text: str):
+        """按tsv的列追加一行
+        :param numbers: [page_num, block_num, par_num, line_num, word_num]"""
+        left, top, right, bottom = box
+        for key, value in zip(DATA_KEYS, [level] + numbers + [left, top, right - left, bottom - top, conf, text]):
+            data[key].append(value)
+
+    def _bounding_box(self, page_iterator: int, level: int) -> Tuple[int, int, int, int]:
+        left, top, right, bottom = (ctypes.c_int() for _ in range(4))
+        if not self.lib.TessPageIteratorBoundingBox(page_iterator, level, ctypes.byref(left), ctypes.byref(top),
+                                                    ctypes.byref(right), ctypes.byref(bottom)):
+            return 0, 0, 0, 0
+        return left.value, top.value, right.value, bottom.value
+
+    def image_to_data(self, mask: np.ndarray, lang: str, config: str) -> Dict[str, List]:
+        data = {key: [] for key in DATA_KEYS}
+        handle, image = self._prepare(mask, lang, config)
+        try:
+            if self.lib.TessBaseAPIRecognize(handle, None) != 0:
+                raise OcrError("libtesseract识别失败")
+            # 与命令行的tsv输出一致：先是整页一行，再按块、段、行、单词逐级展开
+            numbers = [1, 0, 0, 0, 0]
+            self._append_row(data, 1, numbers, (0, 0, image.shape[1], image.shape[0]), -1, "")
+            iterator = self.lib.TessBaseAPIGetIterator(handle)
+            if not iterator:
+                return data
+            try:
+                page_iterator = self.lib.TessResultIteratorGetPageIterator(iterator)
+                while True:
+                    for level in (RIL_BLOCK, RIL_PARA, RIL_TEXTLINE):
+                        if self.lib.TessPageIteratorIsAtBeginningOf(page_iterator, level):
+                            numbers[level + 1] += 1
+                            numbers[level + 2:] = [0] * (3 - level)
+                            self._append_row(data, level + 2, numbers, self._bounding_box(page_iterator, level),
+                                             -1, "")
+                    numbers[RIL_WORD + 1] += 1
+                    text = self._take_text(self.lib.TessResultIteratorGetUTF8Text(iterator, RIL_WORD))
+                    self._append_row(data, RIL_WORD + 2, numbers, self._bounding_box(page_iterator, RIL_WORD),
+                                     self.lib.TessResultIteratorConfidence(iterator, RIL_WORD), text)
+                    if not self.lib.TessResultIteratorNext(iterator, RIL_WORD):
+                        break
+            finally:
+                self.lib.TessResultIteratorDelete(iterator)
+            return data
+        finally:
+            self.lib.TessBaseAPIClear(handle)
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles:
+                self.lib.TessBaseAPIEnd(handle)
+                self.lib.TessBaseAPIDelete(handle)
+            self._handles.clear()
+        self._local = threading.local()
+
+
+class FallbackOcrEngine(OcrEngine):
+    """优先使用主引擎，主引擎出错后永久切换到备用引擎"""
+
+    def __init__(self, primary: OcrEngine, fallback: OcrEngine, on_fallback=None):
+        """
+        :param on_fallback: 切换时的回调，参数为异常对象
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.on_fallback = on_fallback
+        self._active = primary
+
+    @property
+    def name(self):
+        return self._active.name
+
+    def _call(self, method: str, *args):
+        engine = self._active
+        try:
+            return getattr(engine, method)(*args)
+        except (OcrError, OSError, AttributeError) as e:
+            if engine is self.fallback:
+                raise OcrError(str(e))
+            self._active = self.fallback
+            if self.on_fallback:
+                self.on_fallback(e)
+            return getattr(self.fallback, method)(*args)
+
+    def image_to_string(self, mask: np.ndarray, lang: str, config: str) -> str:
+        return self._call("image_to_string", mask, lang, config)
+
+    def image_to_data(self, mask: np.ndarray, lang: str, config: str) -> Dict[str, List]:
+        return self._call("image_to_data", mask, lang, config)
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+
+def _pool_worker(conn, engine_name: str, tesseract_dir: str, tessdata_dir: str, tesseract_cmd: str):
+    """识别进程的主循环：从管道读取请求并返回结果，直到收到None或管道关闭
+
+    请求为(方法名, 参数元组)，响应为("ok", 结果)或("error", 错误信息)。
+    引擎创建失败时进程不退出，而是对每个请求返回该错误，避免反复重启。"""
+    engine, engine_error = None, ""
+    try:
+        engine = create_ocr_engine(engine_name, tesseract_dir, tessdata_dir, tesseract_cmd=tesseract_cmd)
+    except Exception as e:
+        engine_error = f"识别引擎创建失败 {type(e).__name__}: {e}"
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                break
+            if request is None:
+                break
+            method, args = request
+            try:
+                if engine is None:
+                    raise OcrError(engine_error)
+                if method == "ping":
+                    result = engine.name
+                else:
+                    result = getattr(engine, method)(*args)
+                conn.send(("ok", result))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        if engine is not None:
+            engine.close()
+        conn.close()
+
+
+class _PoolWorker:
+    """识别进程及其统计信息"""
+
+    def __init__(self, worker_id: int, context, target_args: tuple):
+        self.worker_id = worker_id
+        self.context = context
+        self.target_args = target_args
+        self.restarts = -1
+        self.calls = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=200)  # 最近的单次识别耗时，单位为秒
+        self.process = None
+        self.conn = None
+        self.start()
+
+    def start(self):
+        """启动（或重启）识别进程"""
+        self.stop()
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=_pool_worker, args=(child_conn,) + self.target_args,
+                                            name=f"ocr-worker-{self.worker_id}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.restarts += 1
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+        self.conn.close()
+        self.process = None
+
+    def request(self, method: str, args: tuple, timeout: float):
+        """发送一次请求并等待结果
+        :raise OcrError: 识别出错、超时或进程已退出"""
+        start = time.perf_counter()
+        try:
+            self.conn.send((method, args))
+            if not self.conn.poll(timeout):
+                raise TimeoutError(f"等待超过{timeout}秒")
+            status, result = self.conn.recv()
+        except (EOFError, OSError, TimeoutError) as e:
+            self.errors += 1
+            self.start()  # 进程崩溃或卡死，重启后由调用方决定是否重试
+            raise OcrError(f"识别进程{self.worker_id}无响应，已重启: {e}")
+        if method != "ping":
+            self.calls += 1
+            self.latencies.append(time.perf_counter() - start)
+        if status != "ok":
+            self.errors += 1
+            raise OcrError(result)
+        return result
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "alive": self.process is not None and self.process.is_alive(),
+            "calls": self.calls,
+            "errors": self.errors,
+            "restarts": self.restarts,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0,
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2)
+            if latencies else 0,
+        }
+
+
+class PoolOcrEngine(OcrEngine):
+    """常驻识别进程池
+
+    每个进程启动时加载一次libtesseract，之后循环从管道读取二值图并返回结果，
+    避免每次识别都启动tesseract.exe。进程崩溃或超时会被自动重启。"""
+
+    name = "pool"
+
+    def __init__(self, size: int = 2, engine_name: str = "capi", tesseract_dir: str = "",
+                 tessdata_dir: str = "", tesseract_cmd: str = "", timeout: float = 5.0):
+        """
+        :param size: 进程数量
+        :param engine_name: 进程内使用的识别引擎 capi / auto / cli，后两者在libtesseract不可用时
+                            每次识别仍会启动tesseract.exe
+        :param tesseract_cmd: 进程内命令行识别使用的tesseract路径
+        :param timeout: 单次识别的超时时间，单位为秒
+        """
+        self.timeout = timeout
+        # Windows只支持spawn，其他平台也统一使用，避免fork带上父进程的线程与句柄
+        context = multiprocessing.get_context("spawn")
+        target_args = (engine_name, tesseract_dir, tessdata_dir, tesseract_cmd)
+        self._workers = [_PoolWorker(i, context, target_args) for i in range(max(1, size))]
+        self._idle = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+        self._last_ping = float("-inf")
+        self.health_check()
+
+    def _call(self, method: str, *args):
+        worker = self._idle.get()
+        try:
+            return worker.request(method, args, self.timeout)
+        finally:
+            self._idle.put(worker)
+
+    def image_to_string(self, mask: np.ndarray, lang: str, config: str) -> str:
+        return self._call("image_to_string", mask, lang, config)
+
+    def image_to_data(self, mask: np.ndarray, lang: str, config: str) -> Dict[str, List]:
+        return self._call("image_to_data", mask, lang, config)
+
+    def health_check(self, ping_interval: float = 0) -> Dict[int, str]:
+        """检查识别进程
+
+        距上次往返检查不足ping_interval秒时只查看进程是否存活，不与进程通信；
+        否则向当前空闲的进程逐个发送ping（无响应的进程会被重启），正在识别的进程不等待。
+        :param ping_interval: 两次往返检查的最小间隔，单位为秒
+        :return: {进程编号: 进程内引擎名、错误信息或 alive / dead / busy}"""
+        now = time.monotonic()
+        if now - self._last_ping < ping_interval:
+            return {worker.worker_id: "alive" if worker.process is not None and worker.process.is_alive()
+                    else "dead" for worker in self._workers}
+        self._last_ping = now
+
+        result = {}
+        for _ in range(len(self._workers)):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker.worker_id in result:
+                self._idle.put(worker)  # 已检查过的进程又回到了队首，其余进程都在识别
+                break
+            try:
+                result[worker.worker_id] = worker.request("ping", (), self.timeout)
+            except OcrError as e:
+                result[worker.worker_id] = str(e)
+            finally:
+                self._idle.put(worker)
+        for worker in self._workers:
+            result.setdefault(worker.worker_id, "busy")
+        return result
+
+    def stats(self) -> Dict[int, dict]:
+        """每个进程的调用次数、错误次数、重启次数与耗时"""
+        return {worker.worker_id: worker.stats() for worker in self._workers}
+
+    def close(self):
+        for worker in self._workers:
+            worker.stop()
+
+
+def create_ocr_engine(name: str = "auto", tesseract_dir: str = "", tessdata_dir: str = "",
+                      on_fallback=None, tesseract_cmd: str = "", pool_size: int = 2,
+                      timeout: float = 5.0) -> OcrEngine:
+    """根据配置创建OCR引擎
+    :param name: auto（进程内优先，失败时回退命令行）/ capi / cli / pool（常驻识别进程池）
+    :param on_fallback: auto、pool模式下改用命令行识别时的回调
+    :param tesseract_cmd: 命令行识别使用的tesseract路径
+    :param pool_size: pool模式的进程数量
+    :param timeout: pool模式单次识别的超时时间，单位为秒
+    :return: OcrEngine"""
+    if name == "cli":
+        return CliOcrEngine(tesseract_cmd)
+    if name == "capi":
+        return CapiOcrEngine(tesseract_dir, tessdata_dir)
+    if name == "pool":
+        # 没有libtesseract时识别进程也只能逐次启动tesseract.exe，进程池只会多出进程间通信的开销
+        try:
+            load_libtesseract(tesseract_dir)
+        except (OSError, AttributeError) as e:
+            if on_fallback:
+                on_fallback(e)
+            return CliOcrEngine(tesseract_cmd)
+        return PoolOcrEngine(pool_size, "capi", tesseract_dir, tessdata_dir, tesseract_cmd, timeout)
+    if name == "auto":
+        try:
+            primary = CapiOcrEngine(tesseract_dir, tessdata_dir)
+        except (OSError, AttributeError) as e:
+            if on_fallback:
+                on_fallback(e)
+            return CliOcrEngine(tesseract_cmd)
+        return FallbackOcrEngine(primary, CliOcrEngine(tesseract_cmd), on_fallback)
+    raise ValueError(f"未知的识别引擎: {name}")
@@ -0,0 +1,191 @@
+#  -*- This file contains the cheap colour statistics prefilter that runs before OCR. -*-
+"""
+每个检测区域从命中的画面中学习三项统计量：平均亮度、16级亮度直方图、边缘密度。
+之后的画面与学到的范围差距过大时直接判定未命中，不再调用tesseract。
+
+统计量在下采样后的区域上计算（每边约32个采样点），单个区域耗时为微秒级。
+样本不足min_samples时不做判断，避免在学习初期漏检。
+
+只从命中的画面学习，被拒绝的区域不会经过OCR，界面变化（悬停、活动主题、亮度调整）后
+可能一直被拒绝。因此每个区域每被拒绝probe_interval次放行一次（或调用方要求时放行），
+放行后OCR命中的画面会被学习，学到的范围随之扩大。
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from Utils.ImageProcess import to_gray
+
+SAMPLE_POINTS = 32  # 下采样后每边的采样点数
+EDGE_STEP = 24  # 相邻采样点亮度差超过该值计为边缘
+
+
+def region_features(image: np.ndarray) -> tuple:
+    """区域的统计量
+    :param image: 区域的BGRA帧
+    :return: (平均亮度, 归一化的16级直方图, 边缘密度)"""
+    height, width = image.shape[:2]
+    step = max(1, min(height, width) // SAMPLE_POINTS)
+    gray = to_gray(image[::step, ::step])
+    histogram = np.bincount((gray >> 4).ravel(), minlength=16) / gray.size
+    edges = np.count_nonzero(np.abs(np.diff(gray.astype(np.int16), axis=1)) > EDGE_STEP)
+    edge_density = edges / max(1, gray.shape[0] * (gray.shape[1] - 1))
+    return float(gray.mean()), histogram, float(edge_density)
+
+
+class RegionModel:
+    """一个检测区域学到的统计量范围"""
+
+    def __init__(self, samples: Optional[list] = None, max_samples: int = 16):
+        self.max_samples = max_samples
+        self.samples: List[tuple] = []  # [(平均亮度, 直方图, 边缘密度), ...]
+        for luminance, histogram, edge_density in samples or []:
+            self.samples.append((luminance, np.asarray(histogram, dtype=np.float64), edge_density))
+        self._update()
+
+    def _update(self):
+        if not self.samples:
+            return
+        luminances = [sample[0] for sample in self.samples]
+        edge_densities = [sample[2] for sample in self.samples]
+        self.luminance_range = (min(luminances), max(luminances))
+        self.edge_range = (min(edge_densities), max(edge_densities))
+        self.histogram = np.mean([sample[1] for sample in self.samples], axis=0)
+        # 样本直方图与平均直方图的最小交集，作为判断的基准
+        self.min_intersection = min(float(np.minimum(sample[1], self.histogram).sum()) for sample in self.samples)
+
+    def learn(self, features: tuple):
+        self.samples.append(features)
+        del self.samples[:-self.max_samples]
+        self._update()
+
+    def accepts(self, features: tuple, luminance_margin: float, edge_margin: float,
+                histogram_margin: float) -> bool:
+        """统计量是否落在学到的范围内（含容差）"""
+        luminance, histogram, edge_density = features
+        if not self.luminance_range[0] - luminance_margin <= luminance <= self.luminance_range[1] + luminance_margin:
+            return False
+        if not (self.edge_range[0] * (1 - edge_margin) <= edge_density
+                <= self.edge_range[1] * (1 + edge_margin) + edge_margin / 10):
+            return False
+        return float(np.minimum(histogram, self.histogram).sum()) >= self.min_intersection - histogram_margin
+
+    def to_json(self) -> list:
+        return [[luminance, histogram.tolist(), edge_density] for luminance, histogram, edge_density in self.samples]
+
+
+class PreFilter:
+    """OCR之前的预筛选
+
+    检测区域命中后调用learn学习该画面；之后check返回False的区域可以直接视为未命中。"""
+
+    def __init__(self, path: str = "", min_samples: int = 3, luminance_margin: float = 16,
+                 edge_margin: float = 0.5, histogram_margin: float = 0.2, probe_interval: int = 20):
+        """
+        :param path: 保存学习结果的JSON文件，为空时不保存
+        :param min_samples: 开始判断所需的最少样本数
+        :param luminance_margin: 平均亮度的容差（灰度级）
+        :param edge_margin: 边缘密度的相对容差
+        :param histogram_margin: 直方图交集的容差
+        :param probe_interval: 每个区域每被拒绝多少次放行一次交给OCR，为0时不放行
+        """
+        self.path = path
+        self.min_samples = min_samples
+        self.luminance_margin = luminance_margin
+        self.edge_margin = edge_margin
+        self.histogram_margin = histogram_margin
+        self.probe_interval = probe_interval
+        self._rejections: Dict[str, int] = {}  # 区域键 -> 连续被拒绝的次数
+        self._models: Dict[str, RegionModel] = {}
+        self._counters: Dict[str, dict] = {}  # 检测名称 -> 统计
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def make_key(name: str, resolution: str, coords: tuple) -> str:
+        return f"{name}/{resolution}/{'_'.join(str(value) for value in coords)}"
+
+    def _counter(self, name: str) -> dict:
+        return self._counters.setdefault(name, {"checks": 0, "rejected": 0, "probes": 0, "false_negatives": 0})
+
+    def check(self, name: str, key: str, image: np.ndarray, probe: bool = False) -> Optional[bool]:
+        """区域是否可能命中
+        :param name: 检测名称，用于分别统计
+        :param key: make_key生成的区域键
+        :param probe: 拒绝时仍然放行（例如长时间停留在同一阶段时）
+        :return: True 需要OCR（含样本不足的情况）/ False 可以跳过OCR /
+                 None 判定未命中但放行OCR，OCR命中时应记录漏检并学习该画面"""
+        with self._lock:
+            model = self._models.get(key)
+        if model is None or len(model.samples) < self.min_samples:
+            return True
+        passed = model.accepts(region_features(image), self.luminance_margin, self.edge_margin,
+                               self.histogram_margin)
+        with self._lock:
+            counter = self._counter(name)
+            counter["checks"] += 1
+            if passed:
+                self._rejections[key] = 0
+                return True
+            counter["rejected"] += 1
+            rejections = self._rejections[key] = self._rejections.get(key, 0) + 1
+            if probe or (self.probe_interval and rejections % self.probe_interval == 0):
+                counter["probes"] += 1
+                return None
+            return False
+
+    def learn(self, key: str, image: np.ndarray):
+        """学习一个命中的画面"""
+        features = region_features(image)
+        with self._lock:
+            self._models.setdefault(key, RegionModel()).learn(features)
+            self._dirty = True
+
+    def record_false_negative(self, name: str):
+        """记录一次被拒绝但OCR命中的情况（审计模式或放行时）"""
+        with self._lock:
+            self._counter(name)["false_negatives"] += 1
+
+    def stats(self) -> dict:
+        """各检测的判断次数、拒绝率与漏检次数"""
+        with self._lock:
+            return {name: dict(counter, rejection_rate=round(counter["rejected"] / counter["checks"], 3)
+                               if counter["checks"] else 0)
+                    for name, counter in self._counters.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._counters.clear()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._models = {key: RegionModel(samples) for key, samples in data.items()}
+
+    def save(self):
+        """有新样本时写入JSON文件"""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            data = {key: model.to_json() for key, model in self._models.items()}
+            self._dirty = False
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def clear(self, name: Optional[str] = None):
+        """清除学到的样本，name为None时清除全部"""
+        with self._lock:
+            self._models = {key: model for key, model in self._models.items()
+                            if name is not None and not key.startswith(f"{name}/")}
+            self._dirty = True
@@ -0,0 +1,61 @@
+#  -*- This file contains the ROI change detector used to skip redundant OCR calls. -*-
+
+import threading
+from typing import Hashable, Optional
+
+import numpy as np
+
+
+class RegionChangeDetector:
+    """记录每个识别区域上一次的二值图与OCR结果
+
+    区域内容与上次相比几乎没有变化时直接复用上次的结果，跳过OCR。"""
+
+    def __init__(self, tolerance: float = 0.002):
+        """
+        :param tolerance: 允许变化的像素比例，不超过该比例视为区域未变化
+        """
+        self.tolerance = tolerance
+        self._regions = {}  # region_key -> (二值图, OCR结果)
+        self._counters = {}  # 检测名称 -> {"executed": 次数, "skipped": 次数}
+        self._lock = threading.Lock()
+
+    def _counter(self, region_key: Hashable) -> dict:
+        name = region_key[0] if isinstance(region_key, tuple) else region_key
+        return self._counters.setdefault(name, {"executed": 0, "skipped": 0})
+
+    def lookup(self, region_key: Hashable, mask: np.ndarray) -> Optional[str]:
+        """区域未变化时返回上次的OCR结果
+        :param region_key: 区域标识，形如(检测名称, 区域序号)
+        :param mask: 当前的二值图
+        :return: 上次的OCR结果，区域有变化时返回None"""
+        with self._lock:
+            entry = self._regions.get(region_key)
+            if entry is not None:
+                previous_mask, result = entry
+                if previous_mask.shape == mask.shape:
+                    changed = np.count_nonzero(previous_mask != mask)
+                    if changed <= self.tolerance * mask.size:
+                        self._counter(region_key)["skipped"] += 1
+                        return result
+            return None
+
+    def update(self, region_key: Hashable, mask: np.ndarray, result: str):
+        """记录区域本次的二值图与OCR结果"""
+        with self._lock:
+            self._regions[region_key] = (mask.copy(), result)
+            self._counter(region_key)["executed"] += 1
+
+    def stats(self) -> dict:
+        """每个检测的OCR执行与跳过次数"""
+        with self._lock:
+            return {name: dict(counter) for name, counter in self._counters.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._counters.clear()
+
+    def clear(self):
+        """清空记录的区域"""
+        with self._lock:
+            self._regions.clear()
@@ -0,0 +1,149 @@
+#  -*- This file contains the single-pass screen state classifier built on top of the OCR detectors. -*-
+
+from typing import Callable, Dict, List, Optional
+
+from Utils.VerdictFilter import VerdictFilter
+
+# 界面状态
+MATCH_LOBBY = "match_lobby"  # 匹配大厅
+READY_ROOM = "ready_room"  # 准备房间
+SETTLEMENT = "settlement"  # 结算页
+DISCONNECT = "disconnect"  # 断线提示
+MAIN_MENU = "main_menu"  # 主页面
+IN_GAME = "in_game"  # 对局中（其他界面均未匹配时推断）
+
+STATE_NAMES = {
+    MATCH_LOBBY: "匹配大厅",
+    READY_ROOM: "准备房间",
+    SETTLEMENT: "结算页",
+    DISCONNECT: "断线提示",
+    MAIN_MENU: "主页面",
+    IN_GAME: "对局中",
+}
+
+
+class StateCandidate:
+    """一个界面状态的判断结果"""
+
+    def __init__(self, state: str, score: float, matched: bool, evidence: List[dict]):
+        """
+        :param score: 命中区域中关键字的最高相似度，未命中时为0
+        :param evidence: 各区域的证据，每项为{"region", "text", "keywords", "matched", "similarity", "source"}
+        """
+        self.state = state
+        self.score = score
+        self.matched = matched
+        self.evidence = evidence
+
+    def __repr__(self):
+        return f"{STATE_NAMES.get(self.state, self.state)}({self.score:.2f})"
+
+
+class ScreenClassification:
+    """一帧画面的分类结果，候选状态按得分从高到低排列"""
+
+    def __init__(self, candidates: List[StateCandidate]):
+        self.ranked = sorted(candidates, key=lambda candidate: candidate.score, reverse=True)
+
+    @property
+    def state(self) -> Optional[str]:
+        """得分最高且命中的状态，没有命中时返回None"""
+        if self.ranked and self.ranked[0].matched:
+            return self.ranked[0].state
+        return None
+
+    def matched(self, state: str) -> bool:
+        """是否命中指定状态"""
+        return any(candidate.matched for candidate in self.ranked if candidate.state == state)
+
+    def evidence(self, state: str) -> List[dict]:
+        for candidate in self.ranked:
+            if candidate.state == state:
+                return candidate.evidence
+        return []
+
+    def __repr__(self):
+        return " > ".join(repr(candidate) for candidate in self.ranked) or "无候选"
+
+
+class ScreenClassifier:
+    """一次截图判断当前界面
+
+    各检测的识别区域去重后只截取一次；同一区域、同一预处理参数的OCR结果在一次分类中共用。"""
+
+    def __init__(self, capture: Callable[[list], Optional[list]],
+                 make_filter: Optional[Callable[[], VerdictFilter]] = None,
+                 frame_id: Optional[Callable[[], object]] = None):
+        """
+        :param capture: 截图函数，参数为[(x1, y1, x2, y2), ...]，返回对应的区域帧列表，失败时返回None
+        :param make_filter: 创建单个状态滤波器的函数，为None时smooth参数无效
+        :param frame_id: 返回刚才截图所用帧的标识（代号、序号等），同一帧只输入滤波器一次；
+                         为None时每次分类都视为新的一帧
+        """
+        self.capture = capture
+        self.make_filter = make_filter
+        self.frame_id = frame_id
+        self._detectors: Dict[str, tuple] = {}  # 状态 -> (检测函数, 获取识别区域的函数)
+        self._filters: Dict[str, VerdictFilter] = {}
+        self._filtered_frames: Dict[str, object] = {}  # 状态 -> 最近一次输入滤波器的帧标识
+
+    def register(self, state: str, detect: Callable, rects: Callable[[], List[tuple]]):
+        """注册状态的检测
+        :param detect: 检测函数，接受关键字参数region_images、evidence、shared，返回bool
+        :param rects: 返回该检测当前识别区域坐标列表的函数"""
+        self._detectors[state] = (detect, rects)
+
+    def classify(self, states: Optional[List[str]] = None, first_match: bool = False,
+                 smooth: bool = False) -> ScreenClassification:
+        """对当前画面分类
+        :param states: 需要判断的状态，按优先级排列，默认全部
+        :param first_match: 按优先级命中一个状态后不再判断其余状态（smooth时以滤波后的判定为准）
+        :param smooth: 各状态的判定经过滤波器，连续多帧确认后才命中或退出；
+                       截图缓存返回的同一帧不会重复计票
+        :return: ScreenClassification，截图失败时不含任何候选"""
+        states = list(states) if states is not None else list(self._detectors) + [IN_GAME]
+        entries = [(state,) + self._detectors[state] for state in states if state in self._detectors]
+
+        region_rects = [rects() for _, _, rects in entries]
+        distinct = list(dict.fromkeys(rect for rect_list in region_rects for rect in rect_list))
+        images = self.capture(distinct) if distinct else []
+        if images is None:
+            return ScreenClassification([])
+        image_of = dict(zip(distinct, images))
+        frame = self.frame_id() if self.frame_id is not None else None
+
+        shared = {}  # 本次分类中共用的OCR结果
+        candidates = []
+        for (state, detect, _), rect_list in zip(entries, region_rects):
+            evidence = []
+            matched = bool(detect(region_images=[image_of[rect] for rect in rect_list],
+                                  evidence=evidence, shared=shared))
+            score = max((item.get("similarity", 1.0) for item in evidence if item["matched"]),
+                        default=1.0) if matched else 0.0
+            if smooth and self.make_filter is not None:
+                verdict = self._filters.get(state)
+                if verdict is None:
+                    verdict = self._filters[state] = self.make_filter()
+                if frame is None or self._filtered_frames.get(state) != frame:
+                    verdict.update(score)
+                    self._filtered_frames[state] = frame
+                matched = verdict.state
+            candidates.append(StateCandidate(state, score, matched, evidence))
+            if matched and first_match:
+                break
+
+        if IN_GAME in states:
+            # 没有任何界面命中时推断为对局中
+            matched = not any(candidate.matched for candidate in candidates)
+            candidates.append(StateCandidate(IN_GAME, 0.75 if matched else 0.0, matched, []))
+        return ScreenClassification(candidates)
+
+    def reset_filters(self):
+        """清空各状态的滤波历史，进入新阶段时调用"""
+        for verdict in self._filters.values():
+            verdict.reset()
+        self._filtered_frames.clear()
+
+    def filter_stats(self) -> dict:
+        """各状态单帧判定被滤波纠正的次数"""
+        return {state: verdict.suppressed for state, verdict in self._filters.items()}
@@ -0,0 +1,188 @@
+#  -*- This file contains the perceptual hash index of regions whose match was confirmed by OCR. -*-
+"""
+检测区域经OCR确认命中后，记录区域画面的差值哈希(dHash)。之后的画面与已记录的哈希
+汉明距离不超过容差时，直接判定命中，不再调用tesseract。
+
+每个区域（检测名称/分辨率/坐标）各自一棵BK树，按汉明距离剪枝查找；
+超出容量时淘汰最久未命中的哈希并重建该区域的树。
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from Utils.ImageProcess import to_gray
+
+
+def dhash(image: np.ndarray, hash_size: int = 16) -> int:
+    """差值哈希：缩放到(hash_size+1)×hash_size的灰度图后比较左右相邻像素
+    :param image: 区域的BGRA帧
+    :return: hash_size*hash_size位的整数"""
+    gray = Image.fromarray(to_gray(image), "L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = np.packbits((pixels[:, 1:] > pixels[:, :-1]).ravel())
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """按汉明距离组织的BK树，节点为[哈希, {距离: 子节点}]"""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value: int):
+        if self.root is None:
+            self.root = [value, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [value, {}]
+                return
+            node = child
+
+    def nearest(self, value: int, tolerance: int) -> Optional[int]:
+        """距离不超过tolerance的最近哈希，没有时返回None"""
+        best, best_distance = None, tolerance + 1
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance < best_distance:
+                best, best_distance = node[0], distance
+            # 三角不等式：只有与当前节点距离在[d - t, d + t]内的子树可能有结果
+            for child_distance, child in node[1].items():
+                if distance - tolerance <= child_distance <= distance + tolerance:
+                    stack.append(child)
+        return best
+
+
+class ScreenSignatureIndex:
+    """已确认命中的区域画面哈希索引"""
+
+    def __init__(self, path: str = "", tolerance: int = 2, max_entries: int = 4096, hash_size: int = 16):
+        """
+        :param path: 保存索引的JSON文件，为空时不保存
+        :param tolerance: 判定为同一画面的最大汉明距离，小于0时不使用索引。
+                          按钮文字不同（如PLAY与CANCEL）的距离可低至4，因此只容许极小的差异
+        :param max_entries: 所有区域合计最多保存的哈希数
+        :param hash_size: dHash的边长，哈希位数为其平方
+        """
+        self.path = path
+        self.tolerance = tolerance
+        self.max_entries = max_entries
+        self.hash_size = hash_size
+        self._entries: Dict[str, OrderedDict] = {}  # 区域键 -> {哈希: None}，按最近命中排序
+        self._trees: Dict[str, BKTree] = {}
+        self._hits = 0
+        self._misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.tolerance >= 0
+
+    @staticmethod
+    def make_key(name: str, lang: str, resolution: str, coords: tuple) -> str:
+        return f"{name}/{lang}/{resolution}/{'_'.join(str(value) for value in coords)}"
+
+    def _tree(self, key: str) -> BKTree:
+        tree = self._trees.get(key)
+        if tree is None:
+            tree = self._trees[key] = BKTree()
+            for value in self._entries.get(key, ()):
+                tree.add(value)
+        return tree
+
+    def lookup(self, key: str, image: np.ndarray) -> bool:
+        """区域画面是否与已确认命中的画面相同"""
+        value = dhash(image, self.hash_size)
+        with self._lock:
+            match = self._tree(key).nearest(value, self.tolerance) if key in self._entries else None
+            if match is None:
+                self._misses += 1
+                return False
+            self._entries[key].move_to_end(match)
+            self._hits += 1
+            return True
+
+    def add(self, key: str, image: np.ndarray):
+        """记录经OCR确认命中的区域画面"""
+        value = dhash(image, self.hash_size)
+        with self._lock:
+            entries = self._entries.setdefault(key, OrderedDict())
+            if value in entries:
+                entries.move_to_end(value)
+                return
+            entries[value] = None
+            self._tree(key).add(value)
+            self._dirty = True
+            self._evict()
+
+    def _evict(self):
+        """超出容量时从哈希最多的区域淘汰最久未命中的项，并重建其BK树"""
+        total = sum(len(entries) for entries in self._entries.values())
+        while total > self.max_entries:
+            key = max(self._entries, key=lambda item: len(self._entries[item]))
+            self._entries[key].popitem(last=False)
+            self._trees.pop(key, None)
+            total -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": sum(len(entries) for entries in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = self._misses = 0
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._entries = {key: OrderedDict((int(value, 16), None) for value in values)
+                             for key, values in data.items()}
+            self._trees.clear()
+            self._evict()
+
+    def save(self):
+        """有新哈希时写入JSON文件"""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            data = {key: [format(value, "x") for value in entries] for key, entries in self._entries.items()}
+            self._dirty = False
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._trees.clear()
+            self._dirty = True
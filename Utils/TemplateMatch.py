@@ -0,0 +1,183 @@
+#  -*- This file contains the normalized cross-correlation template matcher run ahead of OCR. -*-
+"""
+模板按语言、分辨率与检测名称存放：
+
+    <模板目录>/<语言>/<宽>x<高>/<检测名称>/<关键字>_<x1>_<y1>_<x2>_<y2>.png
+
+文件名为模板对应的关键字与模板在客户区中的坐标。不同检测的识别区域可能相同（如匹配大厅与准备房间），
+因此模板只用于保存它的检测，且只在关键字仍属于该区域的配置时使用。
+
+界面元素的位置固定，因此只在模板原位置附近（±jitter像素）计算归一化互相关，
+无需在整个识别区域内滑动搜索；灰度转换也只针对模板所在的范围。
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PIL import Image
+
+from Utils.ImageProcess import to_gray
+
+
+class Template:
+    """预先计算好去均值与范数的灰度模板"""
+
+    def __init__(self, keyword: str, rect: Tuple[int, int, int, int], gray: np.ndarray):
+        self.keyword = keyword
+        self.rect = rect
+        self.shape = gray.shape
+        pixels = gray.astype(np.float32)
+        self.centered = pixels - pixels.mean()
+        self.norm = float(np.sqrt(np.square(self.centered).sum()))
+
+
+def integral(pixels: np.ndarray) -> np.ndarray:
+    """带一行一列零边的积分图，用于O(1)求任意矩形的和"""
+    table = np.zeros((pixels.shape[0] + 1, pixels.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(pixels, axis=0, dtype=np.float64), axis=1, out=table[1:, 1:])
+    return table
+
+
+def file_keyword(keyword: str) -> str:
+    """关键字中不能用于文件名的字符替换为下划线"""
+    return re.sub(r'[\\/:*?"<>|\s]', "_", keyword.strip())
+
+
+class TemplateMatcher:
+    """在OCR之前用模板判断识别区域
+
+    任一模板的得分不低于accept时判定命中；所有模板得分都不高于reject时判定未命中；
+    其余情况（或没有模板）结果不确定，交给OCR。"""
+
+    def __init__(self, directory: str, accept: float = 0.9, reject: float = 0.3, jitter: int = 2):
+        """
+        :param directory: 模板根目录
+        :param accept: 判定命中的最低得分
+        :param reject: 判定未命中的最高得分
+        :param jitter: 在模板原位置周围搜索的像素范围
+        """
+        self.directory = directory
+        self.accept = accept
+        self.reject = reject
+        self.jitter = jitter
+        self._templates: Dict[Tuple[str, str, str], List[Template]] = {}  # (语言, 分辨率, 检测名称) -> 模板列表
+        self._counters = {"matched": 0, "rejected": 0, "inconclusive": 0}
+        self._elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def _folder(self, lang: str, resolution: str, name: str) -> str:
+        return os.path.join(self.directory, lang, resolution, name)
+
+    def _load(self, lang: str, resolution: str, name: str) -> List[Template]:
+        """加载并缓存某语言、分辨率下一个检测的全部模板"""
+        with self._lock:
+            templates = self._templates.get((lang, resolution, name))
+            if templates is not None:
+                return templates
+            templates = []
+            folder = self._folder(lang, resolution, name)
+            if os.path.isdir(folder):
+                for file_name in sorted(os.listdir(folder)):
+                    stem, ext = os.path.splitext(file_name)
+                    parts = stem.rsplit("_", 4)
+                    if ext.lower() != ".png" or len(parts) != 5 or not parts[0]:
+                        continue
+                    try:
+                        rect = tuple(int(value) for value in parts[1:])
+                    except ValueError:
+                        continue
+                    with Image.open(os.path.join(folder, file_name)) as image:
+                        templates.append(Template(parts[0], rect, np.asarray(image.convert("L"))))
+            self._templates[(lang, resolution, name)] = templates
+            return templates
+
+    def save(self, lang: str, resolution: str, name: str, keyword: str, rect: Tuple[int, int, int, int],
+             gray: np.ndarray) -> str:
+        """保存模板
+        :param name: 检测名称，如play、ready
+        :param keyword: 模板中显示的关键字
+        :param rect: 模板在客户区中的坐标(x1, y1, x2, y2)
+        :param gray: uint8灰度图
+        :return: 模板文件路径"""
+        folder = self._folder(lang, resolution, name)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "_".join([file_keyword(keyword)] + [str(value) for value in rect]) + ".png")
+        Image.fromarray(gray, "L").save(path)
+        with self._lock:
+            self._templates.pop((lang, resolution, name), None)
+        return path
+
+    def score(self, template: Template, gray: np.ndarray, origin: Tuple[int, int]) -> float:
+        """模板在识别区域内原位置附近的最高归一化互相关得分，取值[-1, 1]
+        :param gray: 识别区域的灰度图
+        :param origin: 识别区域左上角的客户区坐标"""
+        height, width = template.shape
+        base_x = template.rect[0] - origin[0]
+        base_y = template.rect[1] - origin[1]
+        left, top = max(0, base_x - self.jitter), max(0, base_y - self.jitter)
+        window = gray[top:base_y + height + self.jitter, left:base_x + width + self.jitter]
+        if template.norm == 0 or window.shape[0] < height or window.shape[1] < width:
+            return 0.0
+
+        # 一次计算搜索窗口内所有偏移位置的得分，窗口只转换一次浮点
+        window = window.astype(np.float32)
+        patches = sliding_window_view(window, (height, width))  # (偏移y, 偏移x, height, width)
+        # 模板已去均值，sum((p - mean(p)) * t) == sum(p * t)
+        numerator = np.einsum("abij,ij->ab", patches, template.centered)
+        sums, square_sums = integral(window), integral(np.square(window))
+        rows, cols = numerator.shape
+        total = sums[height:, width:] - sums[:rows, width:] - sums[height:, :cols] + sums[:rows, :cols]
+        square_total = (square_sums[height:, width:] - square_sums[:rows, width:]
+                        - square_sums[height:, :cols] + square_sums[:rows, :cols])
+        deviation = np.sqrt(np.maximum(square_total - total * total / (height * width), 0))
+        scores = np.divide(numerator, deviation * template.norm, out=np.zeros_like(deviation),
+                           where=deviation > 0)
+        return float(scores.max())
+
+    def match(self, lang: str, resolution: str, name: str, rect: Tuple[int, int, int, int],
+              image: np.ndarray, keywords: Optional[List[str]] = None) -> Optional[bool]:
+        """用该检测在识别区域内的模板判断
+        :param name: 检测名称，只使用该检测保存的模板
+        :param rect: 识别区域的客户区坐标
+        :param image: 识别区域的BGRA帧
+        :param keywords: 该区域当前的关键字，提供时只使用这些关键字的模板
+        :return: True 命中 / False 未命中 / None 没有模板或结果不确定"""
+        x1, y1, x2, y2 = rect
+        allowed = {file_keyword(keyword) for keyword in keywords} if keywords is not None else None
+        templates = [template for template in self._load(lang, resolution, name)
+                     if template.rect[0] >= x1 and template.rect[1] >= y1
+                     and template.rect[2] <= x2 and template.rect[3] <= y2
+                     and (allowed is None or template.keyword in allowed)]
+        if not templates:
+            return None
+
+        start = time.perf_counter()
+        # 只转换模板（含搜索余量）覆盖的范围
+        left = max(0, min(template.rect[0] for template in templates) - x1 - self.jitter)
+        top = max(0, min(template.rect[1] for template in templates) - y1 - self.jitter)
+        right = max(template.rect[2] for template in templates) - x1 + self.jitter
+        bottom = max(template.rect[3] for template in templates) - y1 + self.jitter
+        gray = to_gray(image[top:bottom, left:right])
+        best = max(self.score(template, gray, (x1 + left, y1 + top)) for template in templates)
+        verdict = True if best >= self.accept else False if best <= self.reject else None
+        with self._lock:
+            self._elapsed += time.perf_counter() - start
+            self._counters["matched" if verdict else "rejected" if verdict is False else "inconclusive"] += 1
+        return verdict
+
+    def stats(self) -> dict:
+        """命中、未命中、不确定的次数与平均耗时"""
+        with self._lock:
+            count = sum(self._counters.values())
+            return dict(self._counters, mean_ms=round(self._elapsed / count * 1000, 4) if count else 0)
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self._counters:
+                self._counters[key] = 0
+            self._elapsed = 0.0
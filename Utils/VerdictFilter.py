@@ -0,0 +1,64 @@
+#  -*- This file contains the temporal filters that smooth detector verdicts across frames. -*-
+"""
+单帧的识别结果可能因噪声误判（例如断线检测偶然识别出“继续”），直接据此切换流程代价很高。
+滤波器按帧输入检测的置信度，输出经过滞回处理的判定：
+
+    vote  最近m帧中至少n帧命中（置信度不低于enter）才进入，至少n帧未命中才退出
+    ewma  置信度的指数加权平均高于enter时进入，低于exit时退出
+    off   不滤波，置信度不低于enter即命中
+"""
+
+from collections import deque
+
+FILTER_MODES = ("off", "vote", "ewma")
+
+
+class VerdictFilter:
+    """单个检测的滞回滤波器"""
+
+    def __init__(self, mode: str = "vote", n: int = 2, m: int = 3, alpha: float = 0.5,
+                 enter: float = 0.7, exit: float = 0.3):
+        """
+        :param mode: off / vote / ewma
+        :param n: vote模式下切换所需的帧数
+        :param m: vote模式下的窗口帧数
+        :param alpha: ewma模式下新一帧的权重
+        :param enter: 进入命中状态的置信度
+        :param exit: ewma模式下退出命中状态的置信度
+        """
+        self.mode = mode if mode in FILTER_MODES else "vote"
+        self.n = max(1, min(n, m))
+        self.alpha = alpha
+        self.enter = enter
+        self.exit = exit
+        self._window = deque(maxlen=max(1, m))
+        self._average = 0.0
+        self.state = False
+        self.suppressed = 0  # 单帧判定与滤波结果不一致的次数
+
+    def update(self, confidence: float) -> bool:
+        """输入一帧的置信度
+        :return: 滤波后的判定"""
+        raw = confidence >= self.enter
+        if self.mode == "vote":
+            self._window.append(raw)
+            hits = sum(self._window)
+            if not self.state and hits >= self.n:
+                self.state = True
+            elif self.state and len(self._window) - hits >= self.n:
+                self.state = False
+        elif self.mode == "ewma":
+            self._average = self.alpha * confidence + (1 - self.alpha) * self._average
+            if not self.state and self._average >= self.enter:
+                self.state = True
+            elif self.state and self._average <= self.exit:
+                self.state = False
+        else:
+            self.state = raw
+        self.suppressed += raw != self.state
+        return self.state
+
+    def reset(self):
+        self._window.clear()
+        self._average = 0.0
+        self.state = False
@@ -1,11 +1,11 @@
 import ctypes
+import threading
 import pydirectinput
 from ctypes import byref, sizeof
 from ctypes import wintypes
+import numpy as np
 from PIL import Image  # pillow == 9.3.0
-from PIL import ImageGrab
-from PIL import UnidentifiedImageError
-from PyQt5.QtGui import QImage
+from Utils.ImageProcess import frame_from_buffer, frame_to_image
 
 # 初始化pydirectinput
 pydirectinput.FAILSAFE = False
@@ -181,61 +181,236 @@ class BITMAPINFO(ctypes.Structure):
     ]
 
 
+class CaptureContext:
+    """单个窗口的常驻截图上下文
+
+    保存设备上下文、兼容位图与像素缓冲区，仅在窗口尺寸变化时重建，
+    避免每次截图都重复申请和释放GDI资源。"""
+
+    def __init__(self, hwnd):
+        self.hwnd = hwnd
+        self.width = 0
+        self.height = 0
+        self.hdc_screen = None
+        self.hdc_mem = None
+        self.h_bitmap = None
+        self.h_old_bitmap = None
+        self.buffer = None
+        self.bmp_info = BITMAPINFO()
+        # 各项资源的（重新）分配次数
+        self.realloc_counts = {"dc": 0, "bitmap": 0, "buffer": 0, "region": 0}
+        # 区域截图：尺寸 -> (位图, BITMAPINFO)
+        self.hdc_region = None
+        self.region_bitmaps = {}
+        self._lock = threading.Lock()
+
+    def _ensure_dc(self):
+        """首次使用时创建屏幕DC和内存DC"""
+        if self.hdc_mem:
+            return
+        self.hdc_screen = user32.GetDC(None)
+        self.hdc_mem = gdi32.CreateCompatibleDC(self.hdc_screen)
+        self.hdc_region = gdi32.CreateCompatibleDC(self.hdc_screen)
+        self.realloc_counts["dc"] += 1
+
+    def _ensure_bitmap(self, width, height):
+        """窗口尺寸变化时重建位图和像素缓冲区"""
+        if self.h_bitmap and width == self.width and height == self.height:
+            return
+        self._release_bitmap()
+
+        # 创建一个与屏幕兼容的位图
+        self.h_bitmap = gdi32.CreateCompatibleBitmap(self.hdc_screen, width, height)
+        self.h_old_bitmap = gdi32.SelectObject(self.hdc_mem, self.h_bitmap)
+        self.realloc_counts["bitmap"] += 1
+
+        # 准备 BITMAPINFO 结构
+        header = self.bmp_info.bmiHeader
+        header.biSize = sizeof(BITMAPINFOHEADER)
+        header.biWidth = width
+        header.biHeight = -height
+        header.biPlanes = 1
+        header.biBitCount = 32
+        header.biCompression = 0  # BI_RGB 的值是 0
+
+        # 计算所需的缓冲区大小，确保每个扫描线都是4字节对齐
+        aligned_width = ((width + 3) // 4) * 4  # 对齐到最近的4的倍数
+        buffer_size = aligned_width * height * 4  # 每个像素占用 4 字节
+        if self.buffer is None or len(self.buffer) < buffer_size:
+            self.buffer = ctypes.create_string_buffer(buffer_size)
+            self.realloc_counts["buffer"] += 1
+
+        self.width = width
+        self.height = height
+
+    def _release_bitmap(self):
+        if self.h_bitmap:
+            gdi32.SelectObject(self.hdc_mem, self.h_old_bitmap)
+            gdi32.DeleteObject(self.h_bitmap)
+        self.h_bitmap = None
+        self.h_old_bitmap = None
+
+    def _region_bitmap(self, width, height):
+        """获取指定尺寸的区域位图，按尺寸缓存复用"""
+        entry = self.region_bitmaps.get((width, height))
+        if entry is None:
+            h_bitmap = gdi32.CreateCompatibleBitmap(self.hdc_screen, width, height)
+            bmp_info = BITMAPINFO()
+            header = bmp_info.bmiHeader
+            header.biSize = sizeof(BITMAPINFOHEADER)
+            header.biWidth = width
+            header.biHeight = -height
+            header.biPlanes = 1
+            header.biBitCount = 32
+            header.biCompression = 0  # BI_RGB
+            entry = (h_bitmap, bmp_info)
+            self.region_bitmaps[(width, height)] = entry
+            self.realloc_counts["region"] += 1
+        return entry
+
+    def _release_region_bitmaps(self):
+        for h_bitmap, _ in self.region_bitmaps.values():
+            gdi32.DeleteObject(h_bitmap)
+        self.region_bitmaps.clear()
+
+    def _print_window(self):
+        """将窗口内容绘制到内存DC，返回窗口尺寸；窗口无效时返回None"""
+        hwndRect = wintypes.RECT()
+        user32.GetWindowRect(self.hwnd, byref(hwndRect))
+        width = hwndRect.right - hwndRect.left
+        height = hwndRect.bottom - hwndRect.top
+
+        if width <= 0 or height <= 0:
+            return None
+
+        self._ensure_dc()
+        self._ensure_bitmap(width, height)
+
+        # 截取窗口内容
+        user32.PrintWindow(self.hwnd, self.hdc_mem, 0x00000002)  # PRF_CLIENT
+        return width, height
+
+    def grab_regions(self, rects) -> list:
+        """只复制指定矩形区域的像素
+        :param rects: [(x1, y1, x2, y2), ...]，位图坐标
+        :return: 与rects一一对应的BGRA帧列表，区域无效时对应项为None；窗口无效时返回None"""
+        with self._lock:
+            size = self._print_window()
+            if size is None:
+                return None
+            width, height = size
+
+            images = []
+            for x1, y1, x2, y2 in rects:
+                # 裁剪到位图范围内
+                x1, y1 = max(0, x1), max(0, y1)
+                x2, y2 = min(width, x2), min(height, y2)
+                region_width, region_height = x2 - x1, y2 - y1
+                if region_width <= 0 or region_height <= 0:
+                    images.append(None)
+                    continue
+
+                h_bitmap, bmp_info = self._region_bitmap(region_width, region_height)
+                h_old = gdi32.SelectObject(self.hdc_region, h_bitmap)
+                gdi32.BitBlt(self.hdc_region, 0, 0, region_width, region_height,
+                             self.hdc_mem, x1, y1, 0x00CC0020)  # SRCCOPY
+                gdi32.SelectObject(self.hdc_region, h_old)
+
+                # 32位像素的扫描线天然4字节对齐
+                buffer = ctypes.create_string_buffer(region_width * region_height * 4)
+                gdi32.GetDIBits(self.hdc_region, h_bitmap, 0, region_height, buffer, byref(bmp_info), 0)
+                images.append(frame_from_buffer(buffer, region_width, region_height))
+            return images
+
+    def grab_array(self, copy: bool = False) -> np.ndarray:
+        """截取窗口内容，返回像素缓冲区上的BGRA视图
+
+        视图与上下文共用同一块缓冲区，下一次截图（包括其他线程的截图）会覆盖其内容。
+        :param copy: 在持有锁时复制一份返回，需要保留帧或跨线程使用时应传True，事后再copy()可能复制到被覆盖的帧
+        :return: 形状为(height, width, 4)的uint8数组，窗口无效时返回None"""
+        with self._lock:
+            size = self._print_window()
+            if size is None:
+                return None
+            width, height = size
+
+            # 从设备上下文复制像素数据
+            gdi32.GetDIBits(self.hdc_mem, self.h_bitmap, 0, height, self.buffer, byref(self.bmp_info), 0)
+            frame = frame_from_buffer(self.buffer, width, height)
+            return frame.copy() if copy else frame
+
+    def grab(self) -> Image:
+        """截取窗口内容
+        :return: Image，窗口无效时返回None"""
+        frame = self.grab_array(copy=True)
+        if frame is None:
+            return None
+        return frame_to_image(frame)
+
+    def release(self):
+        """释放所有GDI资源"""
+        with self._lock:
+            self._release_bitmap()
+            self._release_region_bitmaps()
+            if self.hdc_mem:
+                gdi32.DeleteDC(self.hdc_mem)
+                gdi32.DeleteDC(self.hdc_region)
+                user32.ReleaseDC(None, self.hdc_screen)
+            self.hdc_mem = None
+            self.hdc_region = None
+            self.hdc_screen = None
+            self.buffer = None
+            self.width = 0
+            self.height = 0
+
+
+# 每个窗口句柄对应一个常驻截图上下文
+_capture_contexts = {}
+_capture_contexts_lock = threading.Lock()
+
+
+def get_capture_context(hwnd) -> CaptureContext:
+    """获取（必要时创建）窗口的截图上下文
+
+    创建新上下文时释放窗口已销毁（游戏重启或重连后窗口重建）的上下文，避免长时间挂机泄漏GDI句柄。
+    :param hwnd: 窗口句柄
+    :return: CaptureContext"""
+    with _capture_contexts_lock:
+        context = _capture_contexts.get(hwnd)
+        if context is None:
+            for stale_hwnd in [item for item in _capture_contexts if not user32.IsWindow(item)]:
+                _capture_contexts.pop(stale_hwnd).release()
+            context = CaptureContext(hwnd)
+            _capture_contexts[hwnd] = context
+        return context
+
+
+def release_capture_contexts():
+    """释放所有窗口的截图上下文"""
+    with _capture_contexts_lock:
+        for context in _capture_contexts.values():
+            context.release()
+        _capture_contexts.clear()
+
+
 def screenshot(hwnd) -> Image:
     """后台截图
     :param hwnd:窗口句柄
     :return: Image"""
+    return get_capture_context(hwnd).grab()
 
-    # 获取窗口的设备上下文
-    hdcScreen = user32.GetDC(None)
-    hdcMem = gdi32.CreateCompatibleDC(hdcScreen)
-    hwndRect = wintypes.RECT()
-    user32.GetWindowRect(hwnd, byref(hwndRect))
-    width = hwndRect.right - hwndRect.left
-    height = hwndRect.bottom - hwndRect.top
-
-    if width <= 0 and height <= 0:
-        return None
-
-    # 创建一个与屏幕兼容的位图
-    hBitmap = gdi32.CreateCompatibleBitmap(hdcScreen, width, height)
-    hOldBitmap = gdi32.SelectObject(hdcMem, hBitmap)
-
-    # 截取窗口内容
-    user32.PrintWindow(hwnd, hdcMem, 0x00000002)  # PRF_CLIENT
 
-    # 准备 BITMAPINFO 结构
-    bmpInfo = BITMAPINFO()
-    bmpInfo.bmiHeader.biSize = sizeof(BITMAPINFOHEADER)
-    bmpInfo.bmiHeader.biWidth = width
-    bmpInfo.bmiHeader.biHeight = -height
-    bmpInfo.bmiHeader.biPlanes = 1
-    bmpInfo.bmiHeader.biBitCount = 32
-    bmpInfo.bmiHeader.biCompression = 0  # BI_RGB 的值是 0
+def screenshot_array(hwnd, copy: bool = False) -> np.ndarray:
+    """后台截图，返回BGRA帧视图
+    :param hwnd: 窗口句柄
+    :param copy: 返回截图时复制的帧，不会被之后的截图覆盖
+    :return: np.ndarray"""
+    return get_capture_context(hwnd).grab_array(copy)
 
-    # 计算所需的缓冲区大小，确保每个扫描线都是4字节对齐
-    aligned_width = ((width + 3) // 4) * 4  # 对齐到最近的4的倍数
-    buffer_size = aligned_width * height * 4  # 每个像素占用 4 字节
 
-    # 为位图数据分配内存
-    buffer = ctypes.create_string_buffer(buffer_size)
-
-    # 从设备上下文复制像素数据
-    gdi32.GetDIBits(hdcMem, hBitmap, 0, height, buffer, byref(bmpInfo), 0)
-
-    # 创建 QImage 并从 buffer 中加载数据
-    q_image = QImage(buffer, width, height, QImage.Format_RGB32)
-
-    try:
-        # 转换PIL.Image对象
-        pillow_image = Image.fromqimage(q_image)
-    except UnidentifiedImageError:
-        pillow_image = ImageGrab.grab()
-
-    # 清理资源
-    gdi32.SelectObject(hdcMem, hOldBitmap)
-    gdi32.DeleteObject(hBitmap)
-    gdi32.DeleteDC(hdcMem)
-    user32.ReleaseDC(None, hdcScreen)
-
-    return pillow_image
+def screenshot_regions(hwnd, rects) -> list:
+    """后台区域截图，只复制所需的矩形区域
+    :param hwnd: 窗口句柄
+    :param rects: [(x1, y1, x2, y2), ...]
+    :return: 每个区域对应一个BGRA帧的列表，窗口无效时返回None"""
+    return get_capture_context(hwnd).grab_regions(rects)
@@ -7,28 +7,22 @@ import copy
 import ctypes
 import functools
 import json
+import multiprocessing
 import os.path
 import random
+import shlex
 import string
 import subprocess
 import sys
-import tempfile
 import threading
 import time
 import webbrowser
-import pydirectinput as py
 import tkinter as tk
 import pyperclip
-import pytesseract
-from pytesseract import Output
 import re
 import numpy as np
 import gc
 import requests
-import win32process
-import win32api
-import win32con
-import win32gui
 import keyboard 
 import logging
 import sentry_sdk
@@ -37,6 +31,7 @@ import pictures_rc  # 导入资源文件
 from sentry_sdk.integrations.logging import LoggingIntegration
 from simpleaudio._simpleaudio import SimpleaudioError
 from simpleaudio import WaveObject
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from configparser import ConfigParser
 from operator import eq, gt, ge, ne
 from PyQt5.QtCore import QTranslator, QLocale, Qt, QCoreApplication, QThread, pyqtSignal, QRegExp, QEvent, \
@@ -57,11 +52,34 @@ from UI.SettingsUI import Ui_SettingDialog
 from UI.CrashReportUI import Ui_CrashReportDialog
 from UI.pyqt_notification import NotificationManager
 
-from Utils.GameOperate import (press_key, release_key, press_mouse, release_mouse, random_direction, random_movement, random_move, random_veer, killer_ctrl,
-                               killer_skill, killer_skillclick)
-from Utils.background_operation import screenshot, py_sim
-from Utils.CustomAction import ActionExecutor
-from Utils.Client2ScreenOperate import MouseController
+from Utils.ImageProcess import crop, to_gray, binarize_stack, build_mosaic, resize, threshold_masks, \
+    THRESHOLD_STRATEGIES
+from Utils.FrameCapture import FrameCache, CaptureThread
+from Utils.CaptureBackend import create_capture_backend
+from Utils.RegionChange import RegionChangeDetector
+from Utils.OcrCache import OcrResultCache
+from Utils.TemplateMatch import TemplateMatcher
+from Utils.PreFilter import PreFilter
+from Utils.ScreenSignature import ScreenSignatureIndex
+from Utils.VerdictFilter import VerdictFilter
+from Utils.KeywordMatcher import KeywordMatch, compile_keywords
+from Utils.ScreenClassifier import ScreenClassifier, MATCH_LOBBY, READY_ROOM, SETTLEMENT, DISCONNECT, MAIN_MENU
+from Utils.FlightRecorder import FlightRecorder
+from Utils.FrameArchive import FrameArchiveReader, FrameArchiveRecorder
+from Utils.OcrEngine import OcrError, PoolOcrEngine, create_ocr_engine, split_by_rows
+
+if sys.platform == "win32":
+    # 按键、鼠标与窗口操作依赖Windows API；其他平台只能通过replay/synthetic截图后端运行检测流程
+    import pydirectinput as py
+    import win32process
+    import win32api
+    import win32con
+    import win32gui
+    from Utils.GameOperate import (press_key, release_key, press_mouse, release_mouse, random_direction, random_movement, random_move, random_veer, killer_ctrl,
+                                   killer_skill, killer_skillclick)
+    from Utils.background_operation import py_sim, get_capture_context
+    from Utils.CustomAction import ActionExecutor
+    from Utils.Client2ScreenOperate import MouseController
 
 
 class CustomSplashScreen(QSplashScreen):
@@ -1139,6 +1157,7 @@ class DebugTool(QDialog, Ui_DebugDialog):
         super().__init__()
         self.setupUi(self)
         self.setWindowIcon(QIcon(":debug/picture/tool.png"))
+        self.record = None  # 打开的录像文件
 
         self.initUI()
         self.init_signals()
@@ -1151,6 +1170,80 @@ class DebugTool(QDialog, Ui_DebugDialog):
     def init_signals(self):
         self.pb_selection_region.clicked.connect(self.pb_selection_region_click)
         self.pb_test.clicked.connect(self.pb_test_click)
+        self.pb_open_record.clicked.connect(self.pb_open_record_click)
+        self.pb_save_template.clicked.connect(self.pb_save_template_click)
+        self.sb_record_frame.valueChanged.connect(self.sb_record_frame_change)
+
+    def pb_open_record_click(self):
+        """打开录像文件，之后的测试使用录像中的帧；取消选择则恢复为实时截图"""
+        if self.record is not None:
+            self.record.close()
+            self.record = None
+        self.sb_record_frame.setDisabled(True)
+
+        path, _ = QFileDialog.getOpenFileName(self, "打开录像", RECORD_PATH, "录像文件 (*.dbdrec)")
+        if not path:
+            Message.showMessage("已切换为实时截图。", 'info')
+            return
+        try:
+            self.record = FrameArchiveReader(path)
+        except (OSError, ValueError) as e:
+            Message.showMessage(f"打开录像失败:{e}", 'error')
+            return
+        if not len(self.record):
+            Message.showMessage("录像中没有帧！", 'warning')
+            self.record.close()
+            self.record = None
+            return
+
+        self.sb_record_frame.setRange(0, len(self.record) - 1)
+        self.sb_record_frame.setValue(0)
+        self.sb_record_frame.setEnabled(True)
+        self.sb_record_frame_change(0)
+
+    def sb_record_frame_change(self, index):
+        """显示录像帧的元数据"""
+        if self.record is None:
+            return
+        self.pe_result.clear()
+        self.pe_result.appendPlainText(
+            f"录像帧{index}/{len(self.record) - 1}：\n{json.dumps(self.record.meta(index), indent=2, ensure_ascii=False)}\n")
+
+    def pb_save_template_click(self):
+        """将框选区域保存为当前语言、分辨率下的模板
+
+        模板归属于识别区域包含框选区域、且该区域关键字包含所填关键字的检测"""
+        coord_xy = self.le_coord.text()
+        if not coord_xy:
+            Message.showMessage("请先框选区域！", 'warning')
+            return
+        coordinates = tuple(int(coord) for coord in coord_xy.split(","))
+        key_words = [item.strip() for item in self.le_keywords.text().split(",") if item.strip()]
+        owners = template_owners(coordinates, key_words)
+        if not owners:
+            Message.showMessage("框选区域与关键字不属于任何检测！", 'warning')
+            return
+
+        if self.record is not None:
+            index = self.sb_record_frame.value()
+            region = self.record.read_region(index, *coordinates)
+            resolution = "{}x{}".format(*self.record.client_size(index))
+        else:
+            if hwnd == 0:
+                Message.showMessage('游戏未启动！', 'error')
+                return
+            images = capture_regions([coordinates])
+            region = images[0] if images is not None else None
+            resolution = client_resolution()
+        if region is None or not region.size:
+            Message.showMessage("识别范围超出画面！", 'warning')
+            return
+
+        gray = to_gray(region)
+        for detector_name, keyword in owners:
+            path = template_matcher.save(ocr_language(), resolution, detector_name, keyword, coordinates, gray)
+            self.pe_result.appendPlainText(f"模板已保存：{path}\n")
+        Message.showMessage('模板已保存！', 'success')
 
     def pb_selection_region_click(self):
         self.root = tk.Tk()
@@ -1159,7 +1252,7 @@ class DebugTool(QDialog, Ui_DebugDialog):
 
     def pb_test_click(self):
         # 获取坐标和关键字
-        if hwnd == 0:
+        if hwnd == 0 and self.record is None:
             Message.showMessage('游戏未启动！', 'error')
             return
         coord_xy = self.le_coord.text()
@@ -1176,15 +1269,31 @@ class DebugTool(QDialog, Ui_DebugDialog):
             Message.showMessage("请输入关键字！", 'warning')
             return
 
+        if self.record is not None:
+            region = self.record.read_region(self.sb_record_frame.value(),
+                                             self.start_x, self.start_y, self.end_x, self.end_y)
+            if not region.size:
+                Message.showMessage("识别范围超出录像画面！", 'warning')
+                return
+        else:
+            images = capture_regions([(self.start_x, self.start_y, self.end_x, self.end_y)])
+            region = images[0] if images is not None else None
+            if region is None:
+                Message.showMessage("识别范围无效！", 'warning')
+                return
+
         self.pe_result.clear()
         self.pe_result.appendPlainText(f"开始测试...\n- - - - - - - - -\n")
         self.pb_test.setDisabled(True)
         self.pb_selection_region.setDisabled(True)
         self.pb_test.setText("测试中")
-        for sum_number in range(130, 20, -10):
-            ocr_result = img_ocr(self.start_x, self.start_y, self.end_x, self.end_y,
-                                 sum_number)
-            if any(keyword in ocr_result for keyword in key_words):
+        # 只截图、灰度化一次，一次生成所有阈值的二值图
+        sum_numbers = list(range(130, 20, -10))
+        masks = binarize_stack(to_gray(region), sum_numbers)
+        matcher = compile_keywords(tuple(item.strip() for item in key_words), self_defined_args['关键字容错'])
+        for sum_number, mask in zip(sum_numbers, masks):
+            ocr_result = mask_ocr(mask)
+            if matcher.search(ocr_result) is not None:
                 self.pe_result.appendPlainText(
                     f"识别成功！\nOCR内容为：{ocr_result}\n二值化值为：{sum_number}\n")
                 break
@@ -1682,6 +1791,7 @@ class Stage:
                 self.log_recorded = True
                 MControl.moveclick(10, 10)
                 log_script("info", f"在'{self.stage_name}'阶段停留时间过长，触发BV循环")
+                dump_flight_record("停留时间过长")
 
     def exit_stage(self):
         """检测到即视为离开阶段，并重置计时开关"""
@@ -1695,19 +1805,20 @@ class Stage:
 def game_stage_redress(game_stage):
     """游戏状态机,阶段纠察机制"""
     while True:
-        if game_stage == "":
+        screen = None if game_stage == "" else screen_classifier.classify((MATCH_LOBBY, READY_ROOM, SETTLEMENT))
+        if screen is None:
             pass
-        elif starthall() and game_stage != "匹配":
+        elif screen.matched(MATCH_LOBBY) and game_stage != "匹配":
             MControl.moveclick(self_defined_args['开始游戏按钮的坐标'][0], 
                                self_defined_args['开始游戏按钮的坐标'][1], 1)
             MControl.moveclick(20, 689, 1, 3)  # 商城上空白
             log_script("debug", f"当前实际为匹配阶段，正在尝试纠正阶段紊乱！")
-        elif readyhall() and game_stage != "准备":
+        elif screen.matched(READY_ROOM) and game_stage != "准备":
             MControl.moveclick(self_defined_args['准备就绪按钮的坐标'][0], 
                                self_defined_args['准备就绪按钮的坐标'][1], 1)
             MControl.moveclick(20, 689, 1, 3)  # 商城上空白
             log_script("debug", f"当前实际为准备阶段，正在尝试纠正阶段紊乱！")
-        elif gameover() and game_stage != "结束":
+        elif screen.matched(SETTLEMENT) and game_stage != "结束":
             MControl.moveclick(self_defined_args['结算页继续按钮坐标'][0], 
                                self_defined_args['结算页继续按钮坐标'][1], 0.5, 1)  # return hall
             MControl.moveclick(10, 10, 1, 3)  # 避免遮挡
@@ -1757,6 +1868,8 @@ def begin():
             except SimpleaudioError:
                 pass
             event.clear()
+            start_capture_thread()
+            start_archive_recorder()
             begingame = threading.Thread(target=afk, daemon=True)
             begingame.start()
             # 如果开启提醒，则开启线程
@@ -1821,6 +1934,10 @@ def kill():
             
             # 释放按键状态
             release_all_keys()
+
+            # 停止后台截图线程
+            stop_capture_thread()
+            stop_archive_recorder()
             
             # 清理其他资源
             index = 0
@@ -1832,11 +1949,72 @@ def kill():
             
         except Exception as e:
             log.error(f"停止时出错: {e}")
-        
+
+        if capture_backend.name == "gdi":
+            log_script("debug", f"截图资源分配次数: {get_capture_context(hwnd).realloc_counts}")
         log.info("结束脚本····\n")
         logging_enabled = False
         Message.showMessage("脚本已停止！", 'info')
 
+def dump_flight_record(reason: str) -> None:
+    """将飞行记录写入磁盘"""
+    try:
+        output_dir = flight_recorder.dump(FLIGHT_RECORD_PATH, reason)
+    except OSError as e:
+        log_script("error", f"写入飞行记录失败: {e}")
+        return
+    if output_dir:
+        log_script("info", f"已保存最近画面记录: {output_dir} {flight_recorder.occupancy()}")
+
+
+def start_capture_thread():
+    """按配置启动后台截图线程"""
+    global capture_thread
+    fps = self_defined_args['后台截图帧率']
+    if fps <= 0:
+        return
+    capture_thread = CaptureThread(capture_backend.grab, fps, self_defined_args['后台截图缓冲帧数'])
+    capture_thread.start()
+
+
+def stop_capture_thread():
+    """停止后台截图线程并记录统计"""
+    global capture_thread
+    if capture_thread is None:
+        return
+    capture_thread.stop()
+    capture_thread.join(timeout=1.0)
+    log_script("debug", f"后台截图统计: {capture_thread.stats()}")
+    capture_thread = None
+
+
+def start_archive_recorder():
+    """按配置开始录制检测用的帧"""
+    global archive_recorder
+    if not self_defined_args['录制录像']:
+        return
+    try:
+        os.makedirs(RECORD_PATH, exist_ok=True)
+        path = os.path.join(RECORD_PATH, f"{time.strftime('%Y%m%d_%H%M%S')}.dbdrec")
+        archive_recorder = FrameArchiveRecorder(path)
+    except OSError as e:
+        log_script("error", f"创建录像文件失败: {e}")
+        return
+    log_script("info", f"正在录制录像: {path}")
+
+
+def stop_archive_recorder():
+    """结束录制并写入索引"""
+    global archive_recorder
+    if archive_recorder is None:
+        return
+    try:
+        archive_recorder.close()
+    except OSError as e:
+        log_script("error", f"写入录像文件失败: {e}")
+    archive_recorder = None
+
+
 def release_all_keys():
     """释放所有按键状态"""
     release_key('w')
@@ -2541,7 +2719,13 @@ def ocr_range_inspection(identification_key: str,
     
     def decorator(func):
         @functools.wraps(func)
-        def wrapper(*args, **kwargs):
+        def wrapper(*args, region_images=None, evidence=None, shared=None, use_signature=True, **kwargs):
+            """
+            :param region_images: 屏幕分类器已截取的各区域帧，为None时自行截图
+            :param evidence: 提供时追加各区域的识别证据
+            :param shared: 一次分类中共用的OCR结果，键为(坐标, 阈值, 阈值策略, 识别配置)
+            :param use_signature: 是否用签名索引代替OCR，点击后的确认检测应传False，必须经OCR确认
+            """
             range_values = self_defined_args[capture_range]
             max_threshold = self_defined_args[threshold_max_name][0]
             keywords_config = self_defined_args[identification_key]
@@ -2549,16 +2733,7 @@ def ocr_range_inspection(identification_key: str,
             if name == 'disconnect' and dbdWindowUi.cb_debug.isChecked():
                 return False
 
-            # 解析区域配置 (每5个数字: x1,y1,x2,y2,threshold)
-            regions = []
-            for i in range(0, len(range_values), 5):
-                if i + 4 < len(range_values):
-                    region = {
-                        'coords': tuple(range_values[i:i+4]),
-                        'threshold': range_values[i+4]
-                    }
-                    regions.append(region)
-            
+            regions = parse_regions(range_values)
             if not regions:
                 log_script("warning", f"{name}未配置有效检测区域")
                 return False
@@ -2580,36 +2755,159 @@ def ocr_range_inspection(identification_key: str,
                 keywords_config = keywords_config[:len(regions)]
                 log_script("debug", f"{name}关键字配置过多，已截断")
 
-            # 遍历所有区域进行检测
-            for region_idx, region in enumerate(regions):
-                x1, y1, x2, y2 = region['coords']
-                current_threshold = region['threshold']
-                current_keywords = keywords_config[region_idx]  # 当前区域的关键字
-                
+            # 一次截图，只复制各检测区域的像素
+            if region_images is None:
+                region_images = capture_regions([region['coords'] for region in regions])
+            if region_images is None:
+                return False
+
+            def run_region(region_idx):
+                """识别单个区域，同一次分类中参数相同的区域只识别一次"""
+                x1, y1, x2, y2 = regions[region_idx]['coords']
+                profile = ocr_profile(name, keywords_config[region_idx])
+                strategy = threshold_strategy(name, region_idx)
+                memo_key = (regions[region_idx]['coords'], regions[region_idx]['threshold'], strategy, profile,
+                            tuple(keywords_config[region_idx]) if strategy == 'otsu_search' else None)
+                if shared is not None and memo_key in shared:
+                    return shared[memo_key]
                 ocr_result = ocr_func(
                     x1, y1, x2, y2,
-                    sum=current_threshold
+                    sum=regions[region_idx]['threshold'],
+                    image=region_images[region_idx],
+                    region_key=(name, region_idx),
+                    profile=profile,
+                    strategy=strategy,
+                    keywords=keywords_config[region_idx]
                 )
-                
+                if shared is not None:
+                    shared[memo_key] = ocr_result
+                return ocr_result
+
+            def record_region(region_idx, ocr_result, source="ocr") -> Optional[KeywordMatch]:
+                """记录区域的识别结果
+                :return: 相似度最高的关键字，未匹配时返回None"""
+                match = compile_keywords(tuple(keywords_config[region_idx]),
+                                         self_defined_args['关键字容错']).search(ocr_result)
+                if evidence is not None:
+                    evidence.append({
+                        "region": region_idx,
+                        "text": ocr_result,
+                        "keywords": keywords_config[region_idx],
+                        "matched": match is not None,
+                        "similarity": match.similarity if match else 0.0,
+                        "source": source,
+                    })
+                current_threshold = regions[region_idx]['threshold']
                 log_script("debug", 
-                    f"{name}区域{region_idx+1}[阈:{current_threshold}] OCR结果: {ocr_result} | 关键字: {current_keywords}"
+                    f"{name}区域{region_idx+1}[阈:{current_threshold}] OCR结果: {ocr_result} | 关键字: {keywords_config[region_idx]}"
+                    + (f" | 匹配: {match.keyword}({match.similarity:.2f})" if match else "")
                 )
+                flight_recorder.record_ocr(f"{name}区域{region_idx+1}", current_threshold, ocr_result)
+                if archive_recorder is not None:
+                    archive_recorder.record_ocr(f"{name}区域{region_idx+1}", current_threshold, ocr_result)
+                return match
+
+            def detected(region_idx):
+                """成功检测处理"""
+                if dbdWindowUi.cb_bvinit.isChecked() and self_defined_args[threshold_max_name][1] == 1:
+                    self_defined_args[threshold_max_name][1] = 0
+                    with open(SDAGRS_PATH, 'w', encoding='utf-8') as f:
+                        json.dump(self_defined_args, f, indent=4, ensure_ascii=False)
 
-                # 检查是否包含当前区域的任一关键字
-                if any(keyword in ocr_result for keyword in current_keywords):
-                    # 成功检测处理
-                    if dbdWindowUi.cb_bvinit.isChecked() and self_defined_args[threshold_max_name][1] == 1:
-                        self_defined_args[threshold_max_name][1] = 0
-                        with open(SDAGRS_PATH, 'w', encoding='utf-8') as f:
-                            json.dump(self_defined_args, f, indent=4, ensure_ascii=False)
-                    
-                    log_script("debug", f"{name}区域{region_idx+1}检测到关键字")
+                if prefilter_mode and resolution and region_images[region_idx] is not None:
+                    prefilter.learn(PreFilter.make_key(name, resolution, regions[region_idx]['coords']),
+                                    region_images[region_idx])
+                    if region_idx in prefiltered:
+                        prefilter.record_false_negative(name)
+                
+                log_script("debug", f"{name}区域{region_idx+1}检测到关键字")
+
+            def check_region(region_idx, ocr_result) -> bool:
+                """记录区域的识别结果，并检查是否包含该区域的任一关键字（容许少量误识别）"""
+                match = record_region(region_idx, ocr_result)
+                if match is not None:
+                    # 只有完全匹配的画面才写入签名索引
+                    if match.similarity == 1 and signature_index.enabled and resolution \
+                            and region_images[region_idx] is not None:
+                        signature_index.add(signature_key(region_idx), region_images[region_idx])
+                    detected(region_idx)
                     return True
+                return False
+
+            def signature_key(region_idx):
+                return ScreenSignatureIndex.make_key(name, lan, resolution, regions[region_idx]['coords'])
+
+            # 模板匹配：结果明确的区域不再进行OCR
+            pending = []
+            prefiltered = set()  # 预筛选判定未命中的区域
+            prefilter_mode = self_defined_args['预筛选']
+            resolution, lan = client_resolution(), ocr_language()
+            for region_idx, region in enumerate(regions):
+                verdict = None
+                if resolution and region_images[region_idx] is not None:
+                    verdict = template_matcher.match(lan, resolution, name, region['coords'], region_images[region_idx],
+                                                     keywords_config[region_idx])
+                if verdict:
+                    record_region(region_idx, "<模板匹配>", source="template")
+                    if evidence is not None:
+                        evidence[-1].update(matched=True, similarity=1.0)
+                    detected(region_idx)
+                    return True
+                if verdict is None and use_signature and signature_index.enabled and resolution \
+                        and region_images[region_idx] is not None \
+                        and signature_index.lookup(signature_key(region_idx), region_images[region_idx]):
+                    # 与OCR确认过的画面相同
+                    record_region(region_idx, "<签名索引>", source="signature")
+                    if evidence is not None:
+                        evidence[-1].update(matched=True, similarity=1.0)
+                    detected(region_idx)
+                    return True
+                passed = True
+                if verdict is None and prefilter_mode and resolution and region_images[region_idx] is not None:
+                    passed = prefilter.check(name, PreFilter.make_key(name, resolution, region['coords']),
+                                             region_images[region_idx], probe=stage_monitor.long_stay_switch)
+                if passed is not True:
+                    # 预筛选：颜色统计与命中时差距过大；审计模式与定期放行时仍然识别，命中则记录漏检并学习
+                    prefiltered.add(region_idx)
+                    if passed is False and prefilter_mode != 2:
+                        record_region(region_idx, "<预筛选>", source="prefilter")
+                        continue
+                if verdict is None:
+                    pending.append(region_idx)
+
+            if self_defined_args['合并识别'] and len(pending) > 1:
+                # 合并识别：所有区域拼接后只调用一次OCR
+                batch_results = img_ocr_batch([region_images[idx] for idx in pending],
+                                              [regions[idx]['threshold'] for idx in pending],
+                                              [(name, idx) for idx in pending],
+                                              [threshold_strategy(name, idx) for idx in pending],
+                                              ocr_profile(name, [keyword for idx in pending
+                                                                 for keyword in keywords_config[idx]], psm=3))
+                for region_idx, ocr_result in zip(pending, batch_results):
+                    if check_region(region_idx, ocr_result):
+                        return True
+            elif ocr_executor is not None and len(pending) > 1:
+                # 并行识别：任一区域命中后取消尚未开始的区域
+                futures = {ocr_executor.submit(run_region, idx): idx for idx in pending}
+                try:
+                    for future in as_completed(futures):
+                        if check_region(futures[future], future.result()):
+                            return True
+                finally:
+                    for future in futures:
+                        future.cancel()
+            else:
+                # 遍历所有区域进行检测
+                for region_idx in pending:
+                    if check_region(region_idx, run_region(region_idx)):
+                        return True
 
             # 自适应阈值调整（仅在BV初始化或长时间停留时触发）
             if dbdWindowUi.cb_bvinit.isChecked() or stage_monitor.long_stay_switch:
                 # 更新所有区域的阈值
                 for i in range(4, len(range_values), 5):  # 遍历所有区域的阈值索引
+                    if threshold_strategy(name, i // 5) != 'fixed':
+                        continue  # 其他策略每帧根据直方图计算阈值，无需逐次调整
                     # 每个区域减少10，如果低于30则重置为上限值
                     if range_values[i] <= 30:
                         range_values[i] = max_threshold
@@ -2620,69 +2918,244 @@ def ocr_range_inspection(identification_key: str,
 
             return False
 
+        wrapper.capture_range = capture_range
+        wrapper.identification_key = identification_key
+        wrapper.detector_name = name
         return wrapper
     return decorator
 
 
-def img_ocr(x1, y1, x2, y2, sum=128) -> str:
+def template_owners(coords: tuple, keywords: list) -> list:
+    """框选的模板属于哪些检测
+    :param coords: 模板的客户区坐标(x1, y1, x2, y2)
+    :param keywords: 模板中显示的关键字
+    :return: [(检测名称, 关键字), ...]，识别区域包含模板且该区域关键字包含所填关键字"""
+    owners = []
+    for detector in (starthall, readyhall, gameover, mainjudge, disconnect_check):
+        keywords_config = self_defined_args[detector.identification_key]
+        if not keywords_config:
+            continue
+        for region_idx, region in enumerate(parse_regions(self_defined_args[detector.capture_range])):
+            x1, y1, x2, y2 = region['coords']
+            if not (coords[0] >= x1 and coords[1] >= y1 and coords[2] <= x2 and coords[3] <= y2):
+                continue
+            region_keywords = keywords_config[min(region_idx, len(keywords_config) - 1)]
+            owners += [(detector.detector_name, keyword) for keyword in keywords
+                       if keyword in region_keywords and (detector.detector_name, keyword) not in owners]
+    return owners
+
+
+def parse_regions(range_values: list) -> list:
+    """解析区域配置 (每5个数字: x1,y1,x2,y2,threshold)
+    :return: [{'coords': (x1, y1, x2, y2), 'threshold': threshold}, ...]"""
+    regions = []
+    for i in range(0, len(range_values), 5):
+        if i + 4 < len(range_values):
+            region = {
+                'coords': tuple(range_values[i:i+4]),
+                'threshold': range_values[i+4]
+            }
+            regions.append(region)
+    return regions
+
+
+def capture_regions(coords_list: list) -> Optional[list]:
+    """截取多个客户区矩形，返回与之对应的区域帧
+    :param coords_list: [(x1, y1, x2, y2), ...] 客户区坐标
+    :return: BGRA帧列表，无效区域对应None；截图失败时返回None"""
+    if not capture_backend.available():
+        Message.showMessage('未检测到游戏窗口！', 'warning')
+        return None
+
+    rects = [capture_backend.client_to_frame(*coords) for coords in coords_list]
+    capture_state.frame_id = None
+
+    # 优先取后台线程的最新帧，未启用、尚无帧或最新帧已过期时使用有效期内共用的缓存帧；
+    # 各检测的区域都从同一帧中裁剪，区域组合不同也只截图一次
+    frame = None
+    if capture_thread is not None:
+        frame = capture_thread.latest(max(frame_cache.max_age, 2 * capture_thread.interval))
+        capture_state.frame_id = ("thread", capture_thread.last_sequence)
+    if frame is None:
+        frame = frame_cache.get()
+        capture_state.frame_id = ("cache", frame_cache.last_generation)
+    if frame is None:
+        images = None
+    else:
+        flight_recorder.record_frame(frame)
+        if archive_recorder is not None:
+            archive_recorder.record_frame(frame, {"stage": game_stage,
+                                                  "client_size": capture_backend.client_size()})
+        images = []
+        for rect in rects:
+            region = crop(frame, *rect)
+            images.append(region if region.size else None)
+    if images is None:
+        Message.showMessage('无效的截图区域，游戏或已崩溃！', 'error')
+        log_script("warning", f"截图失败，无效的截图区域！")
+        kill()
+    return images
+
+
+def img_ocr(x1, y1, x2, y2, sum=128, image=None, region_key=None, profile=None,
+            strategy="fixed", keywords=None) -> str:
     """OCR识别图像，返回字符串
+    :param image: 已截取的区域BGRA帧，为None时自行截取
+    :param region_key: 区域标识，提供时区域内容未变化则复用上次的结果
+    :param profile: ocr_profile返回的(语言, 识别参数, 缩放倍数)，为None时使用默认配置
+    :param strategy: 阈值策略 fixed（使用sum）/ otsu / sauvola / otsu_search
+    :param keywords: otsu_search依次尝试各阈值，返回第一个包含关键字的结果
     :return: string"""
     # 坐标校验
     if x1 >= x2 or y1 >= y2:
         log_script("debug", f"无效区域坐标: ({x1},{y1})-({x2},{y2})")
         return ""
 
-    if hwnd == 0:
-        Message.showMessage('未检测到游戏窗口！', 'warning')
-        return ""
     result = ""
-    
-    image = screenshot(hwnd)
     if image is None:
-        Message.showMessage('无效的截图区域，游戏或已崩溃！', 'error')
-        log_script("warning", f"截图失败，无效的截图区域！")
-        kill()
+        images = capture_regions([(x1, y1, x2, y2)])
+        if images is None:
+            return result
+        image = images[0]
+    if image is None:
         return result
 
-    screen_x1, screen_y1 = MControl.client_to_screen(x1, y1)
-    screen_x2, screen_y2 = MControl.client_to_screen(x2, y2)
+    lan, custom_config, scale = profile or (ocr_language(), r'--oem 3 --psm 6', 1)
+
+    # 转换为灰度图并按阈值策略二值化，masks[0]为首选结果
+    masks = threshold_masks(resize(to_gray(image), scale), strategy, sum)
+    binary_mask = masks[0]
+    if region_key is not None:
+        previous_result = region_change.lookup(region_key, binary_mask)
+        if previous_result is not None:
+            return previous_result
+
+    result = mask_ocr(binary_mask, (lan, custom_config, scale))
+    matcher = compile_keywords(tuple(keywords), self_defined_args['关键字容错']) if keywords else None
+    if matcher is not None and matcher.search(result) is None:
+        for candidate in masks[1:]:
+            candidate_result = mask_ocr(candidate, (lan, custom_config, scale))
+            if matcher.search(candidate_result) is not None:
+                result = candidate_result
+                break
+    if region_key is not None:
+        region_change.update(region_key, binary_mask, result)
+    return result
 
-    # 按区域裁剪
-    cropped_pixmap = image.crop((screen_x1, screen_y1, screen_x2, screen_y2))
-    # 转换为灰度图
-    grayscale_image = cropped_pixmap.convert('L')
-    # 二值化
-    binary_image = grayscale_image.point(lambda x: 255 if x > sum else 0, '1')
 
-    custom_config = r'--oem 3 --psm 6'  # ocr识别模式
-    # 判断中英文切换模型
-    if cfg.getboolean("UPDATE", "rb_chinese"):
-        lan = "chi_sim"
-    elif cfg.getboolean("UPDATE", "rb_english"):
-        lan = "eng"
-    else:
-        lan = "chi_sim+eng"  # 默认简体中文+英文
+def mask_ocr(binary_mask, profile=None) -> str:
+    """识别已二值化的图像，优先使用结果缓存
+    :param binary_mask: uint8二值图
+    :param profile: ocr_profile返回的(语言, 识别参数, 缩放倍数)，为None时使用默认配置
+    :return: 去除空白的识别结果"""
+    lan, custom_config, _ = profile or (ocr_language(), r'--oem 3 --psm 6', 1)
+    cache_key = ocr_cache.make_key(binary_mask, lan, custom_config)
+    cached_result = ocr_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
 
+    result = ""
     try:
-        # 创建一个临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_path = temp_file.name
-            # 将二值化后的图像保存到临时文件
-            binary_image.save(temp_path, format='JPEG')
-            try:
-                # 使用Tesseract OCR引擎识别图像中的文本
-                result_unprocessed = pytesseract.image_to_string(temp_path, config=custom_config, lang=lan)
-                if result_unprocessed:
-                    result = "".join(result_unprocessed.split())
-            except pytesseract.TesseractError:
-                result = ""
-    finally:
-        # 确保临时文件被删除，防止内存泄露和磁盘空间占用
-        os.unlink(temp_path)
-
+        # 使用Tesseract OCR引擎识别图像中的文本
+        result_unprocessed = ocr_engine.image_to_string(binary_mask, lan, custom_config)
+        if result_unprocessed:
+            result = "".join(result_unprocessed.split())
+        ocr_cache.put(cache_key, result)
+    except OcrError:
+        pass
     return result
 
 
+def img_ocr_batch(images: list, thresholds: list, region_keys: list, strategies: list, profile=None) -> list:
+    """多个区域拼接为一张图，只调用一次OCR，再按位置把文字分配回各区域
+    :param images: 已截取的区域BGRA帧列表，无效区域为None
+    :param thresholds: 每个区域的二值化阈值
+    :param region_keys: 每个区域的标识，区域内容未变化的复用上次的结果
+    :param strategies: 每个区域的阈值策略，拼接图只使用首选的二值图
+    :param profile: ocr_profile返回的(语言, 识别参数, 缩放倍数)，为None时使用默认配置
+    :return: 与images一一对应的识别结果"""
+    # 拼接图中区域大小不一，使用自动版面分析
+    lan, custom_config, scale = profile or (ocr_language(), r'--oem 3 --psm 3', 1)
+    results = [""] * len(images)
+    pending = []  # (区域序号, 二值图, 缓存键)
+    for idx, image in enumerate(images):
+        if image is None:
+            continue
+        binary_mask = threshold_masks(resize(to_gray(image), scale), strategies[idx], thresholds[idx])[0]
+        previous_result = region_change.lookup(region_keys[idx], binary_mask)
+        if previous_result is not None:
+            results[idx] = previous_result
+            continue
+        cache_key = ocr_cache.make_key(binary_mask, lan, custom_config)
+        cached_result = ocr_cache.get(cache_key)
+        if cached_result is not None:
+            results[idx] = cached_result
+            region_change.update(region_keys[idx], binary_mask, cached_result)
+        else:
+            pending.append((idx, binary_mask, cache_key))
+    if not pending:
+        return results
+
+    mosaic, spans = build_mosaic([binary_mask for _, binary_mask, _ in pending])
+    try:
+        texts = split_by_rows(ocr_engine.image_to_data(mosaic, lan, custom_config), spans)
+    except OcrError:
+        texts = None
+
+    for i, (idx, binary_mask, cache_key) in enumerate(pending):
+        results[idx] = texts[i] if texts is not None else ""
+        region_change.update(region_keys[idx], binary_mask, results[idx])
+        if texts is not None:
+            ocr_cache.put(cache_key, results[idx])
+    return results
+
+
+def client_resolution() -> str:
+    """当前画面的分辨率，形如'1920x1080'，用于选择模板；未知时返回空字符串"""
+    size = capture_backend.client_size()
+    return f"{size[0]}x{size[1]}" if size else ""
+
+
+def ocr_profile(name: str, keywords: list, psm: Optional[int] = None) -> tuple:
+    """读取检测的OCR识别配置（SDargs.json中的'识别配置'）
+
+    每项可设置 lang（为空时按界面语言）、oem、psm、scale（识别前的缩放倍数）、
+    whitelist（限定字符集，为'keywords'时取关键字中出现的字符）。
+    :param name: 检测名称，如play、ready
+    :param keywords: 该区域的关键字
+    :param psm: 覆盖配置中的页面分割模式
+    :return: (语言, tesseract识别参数, 缩放倍数)"""
+    profile = self_defined_args['识别配置'].get(name, {})
+    lan = profile.get('lang') or ocr_language()
+    custom_config = f"--oem {profile.get('oem', 3)} --psm {psm if psm is not None else profile.get('psm', 6)}"
+    whitelist = profile.get('whitelist', '')
+    if whitelist == 'keywords':
+        whitelist = "".join(sorted(set("".join(keywords)) - set(string.whitespace)))
+    if whitelist:
+        custom_config += f" -c tessedit_char_whitelist={shlex.quote(whitelist)}"
+    return lan, custom_config, profile.get('scale', 1)
+
+
+def threshold_strategy(name: str, region_idx: int) -> str:
+    """检测区域的阈值策略，读取识别配置中的threshold项
+
+    threshold可以是一个策略名，也可以是每个区域各自的策略列表（不足时沿用最后一项）。"""
+    strategy = self_defined_args['识别配置'].get(name, {}).get('threshold', 'fixed')
+    if isinstance(strategy, list):
+        strategy = strategy[min(region_idx, len(strategy) - 1)] if strategy else 'fixed'
+    return strategy if strategy in THRESHOLD_STRATEGIES else 'fixed'
+
+
+def ocr_language() -> str:
+    """根据界面设置选择OCR语言"""
+    # 判断中英文切换模型
+    if cfg.getboolean("UPDATE", "rb_chinese"):
+        return "chi_sim"
+    elif cfg.getboolean("UPDATE", "rb_english"):
+        return "eng"
+    return "chi_sim+eng"  # 默认简体中文+英文
+
+
 @ocr_range_inspection('匹配大厅识别关键字',
                       img_ocr, '匹配阶段的识别范围', '匹配大厅二值化阈值', "play")
 def starthall() -> bool:
@@ -2734,9 +3207,11 @@ def disconnect_check() -> bool:
     pass
 
 
-def disconnect_confirm(sum=120) -> None:
-    """After disconnection click confirm button. not need process."""
-    # 使用传入的二值化阈值 sum 进行OCR；支持多识别范围；英文不做小写转换，只去除空白
+def disconnect_confirm(sums=(120,)) -> Optional[int]:
+    """After disconnection click confirm button. not need process.
+    :param sums: 依次尝试的二值化阈值，每个区域只截图、灰度化一次
+    :return: 匹配并点击（或无识别结果按下回车）时使用的阈值，未操作时返回None"""
+    # 使用传入的二值化阈值进行OCR；支持多识别范围；英文不做小写转换，只去除空白
 
     # 识别范围（支持多个区域：每5个为一组 x1,y1,x2,y2,threshold）
     range_values = self_defined_args['断线检测的识别范围']
@@ -2745,13 +3220,13 @@ def disconnect_confirm(sum=120) -> None:
 
     if not isinstance(target_strings, list) or not target_strings:
         log_script("warning", "未配置断线确认关键字，跳过点击确认。")
-        return
+        return None
 
     # 将关键字做最小归一化：仅去空白，不改变大小写
     norm_targets = [str(t).strip() for t in target_strings if str(t).strip()]
     if not norm_targets:
         log_script("warning", "断线确认关键字为空，跳过点击确认。")
-        return
+        return None
 
     # 解析区域列表（兼容旧配置：若仅4个值，视为单区域）
     regions = []
@@ -2764,93 +3239,95 @@ def disconnect_confirm(sum=120) -> None:
         regions.append(tuple(range_values))
     else:
         log_script("warning", "断线检测的识别范围配置无效，跳过点击确认。")
-        return
-
-    image = screenshot(hwnd)
-    if image is None:
-        Message.showMessage('无效的截图区域，游戏或已崩溃！', 'error')
-        log_script("warning", "截图失败，无效的截图区域！")
-        kill()
-        return
+        return None
 
-    # OCR语言
-    if cfg.getboolean("UPDATE", "rb_chinese"):
-        lan = "chi_sim"
-    elif cfg.getboolean("UPDATE", "rb_english"):
-        lan = "eng"
-    else:
-        lan = "chi_sim+eng"
+    region_images = capture_regions(regions)
+    if region_images is None:
+        return None
 
-    custom_config = r'--oem 3 --psm 6'
+    lan, custom_config, scale = ocr_profile('disconnect', norm_targets)
+    matcher = compile_keywords(tuple(norm_targets), self_defined_args['关键字容错'])
 
-    # 遍历所有区域，找到最佳匹配后立即点击
-    for region_idx, (x1c, y1c, x2c, y2c) in enumerate(regions):
-        # 客户端 -> 屏幕坐标
-        screen_x1, screen_y1 = MControl.client_to_screen(x1c, y1c)
-        screen_x2, screen_y2 = MControl.client_to_screen(x2c, y2c)
+    # 每个区域一次生成所有阈值的二值图（低于sum为0，其余为255）
+    region_masks = [binarize_stack(resize(to_gray(cropped), scale), [sum - 1 for sum in sums])
+                    if cropped is not None else None for cropped in region_images]
 
-        # 裁剪并阈值化
-        cropped = image.crop((screen_x1, screen_y1, screen_x2, screen_y2))
-        binary = cropped.convert('L').point(lambda x: 0 if x < sum else 255)
+    # 按阈值依次遍历所有区域，找到最佳匹配后立即点击
+    for sum_idx, sum in enumerate(sums):
+        for region_idx, (x1c, y1c, x2c, y2c) in enumerate(regions):
+            if region_masks[region_idx] is None:
+                continue
+            binary = region_masks[region_idx][sum_idx]
 
-        try:
-            data = pytesseract.image_to_data(binary, lang=lan, config=custom_config, output_type=Output.DICT)
-        except pytesseract.TesseractError:
-            continue
+            try:
+                data = ocr_engine.image_to_data(binary, lan, custom_config)
+            except OcrError:
+                continue
 
-        n = len(data.get('text', []))
-        if n == 0:
-            log_script("debug", f"断线确认OCR无结果。区域:{region_idx+1}")
-            press_key('enter')
-            time.sleep(0.1)
-            release_key('enter')
-            continue
+            n = len(data.get('text', []))
+            if n == 0:
+                log_script("debug", f"断线确认OCR无结果。区域:{region_idx+1}")
+                press_key('enter')
+                time.sleep(0.1)
+                release_key('enter')
+                return sum  # 按键后画面已变化，其余二值图已过期，交给调用方重新检测
 
-        best_idx = -1
-        best_conf = -1.0
-        best_target = None
+            best_idx = -1
+            best_score = (0.0, -1.0)  # (相似度, 置信度)
+            best_target = None
 
-        for i in range(n):
-            txt = str(data['text'][i]).strip()
-            if not txt:
+            for i in range(n):
+                txt = str(data['text'][i]).strip()
+                if not txt:
+                    continue
+                try:
+                    conf = float(data.get('conf', ['-1'])[i])
+                except ValueError:
+                    conf = -1.0
+
+                # 保持大小写敏感匹配（根据需求不对英文小写化），相似度相同时取置信度高的词
+                match = matcher.search(txt)
+                if match is not None and (match.similarity, conf) > best_score:
+                    best_score = (match.similarity, conf)
+                    best_idx = i
+                    best_target = match.keyword
+
+            if best_idx == -1:
                 continue
-            try:
-                conf = float(data.get('conf', ['-1'])[i])
-            except ValueError:
-                conf = -1.0
-
-            for t in norm_targets:
-                # 保持大小写敏感匹配（根据需求不对英文小写化）
-                if t and t in txt:
-                    if conf > best_conf:
-                        best_conf = conf
-                        best_idx = i
-                        best_target = t
-
-        if best_idx == -1:
-            continue
 
-        # 取该词的边界框，转换为客户端坐标
-        x = int(data['left'][best_idx])
-        y = int(data['top'][best_idx])
-        w = int(data['width'][best_idx])
-        h = int(data['height'][best_idx])
+            # 取该词的边界框（还原识别前的缩放），转换为客户端坐标
+            x = int(data['left'][best_idx] / scale)
+            y = int(data['top'][best_idx] / scale)
+            w = int(data['width'][best_idx] / scale)
+            h = int(data['height'][best_idx] / scale)
 
-        cx_in_crop = x + w // 2
-        cy_in_crop = y + h // 2
+            cx_in_crop = x + w // 2
+            cy_in_crop = y + h // 2
 
-        click_x = x1c + cx_in_crop + int(offset[0])
-        click_y = y1c + cy_in_crop + int(offset[1])
+            click_x = x1c + cx_in_crop + int(offset[0])
+            click_y = y1c + cy_in_crop + int(offset[1])
 
-        log_script("debug", f"断线确认：区域{region_idx+1}匹配到关键字 '{best_target}'，置信度={best_conf:.1f}，点击({click_x}, {click_y})。")
+            log_script("debug", f"断线确认：区域{region_idx+1}匹配到关键字 '{best_target}'，相似度={best_score[0]:.2f}，"
+                                f"置信度={best_score[1]:.1f}，点击({click_x}, {click_y})。")
 
-        MControl.moveclick(click_x, click_y, 1, 1)
-        press_key('enter')
-        time.sleep(0.1)
-        release_key('enter')
-        return
+            MControl.moveclick(click_x, click_y, 1, 1)
+            press_key('enter')
+            time.sleep(0.1)
+            release_key('enter')
+            return sum
 
     log_script("debug", "断线确认：所有区域均未匹配到关键字。")
+    return None
+
+
+def retry_disconnect_confirm(sums=range(130, 80, -10)) -> None:
+    """依次尝试各阈值点击断线确认，直到断线提示消失或所有阈值都未匹配"""
+    sums = list(sums)
+    while sums:
+        matched = disconnect_confirm(sums)
+        if matched is None or not disconnect_check():
+            break
+        sums = sums[sums.index(matched) + 1:]  # 点击后仍未恢复，用剩余阈值重新截图识别
 
 
 def reconnect() -> bool:
@@ -2859,20 +3336,20 @@ def reconnect() -> bool:
     """
     global stop_space, stop_action
     log_script("info", f"检测到游戏断线，进入重连···")
+    dump_flight_record("断线重连")
     time.sleep(1)
     stop_space = True  # 自动空格线程标志符
     stop_action = True  # 动作线程标志符
     if disconnect_check():
-        for sum in range(130, 80, -10):
-            disconnect_confirm(sum)
-            if not disconnect_check():
-                break
+        retry_disconnect_confirm()
 
     # 检测以判断断线情况
-    if starthall() or readyhall():  # 小退
+    screen = screen_classifier.classify((MATCH_LOBBY, READY_ROOM, SETTLEMENT), first_match=True)
+    log_script("debug", f"重连界面判断: {screen}")
+    if screen.matched(MATCH_LOBBY) or screen.matched(READY_ROOM):  # 小退
         log_script("info", f"重连完成···类型：错误代码")
         return True
-    elif gameover():  # 意味着不在大厅
+    elif screen.matched(SETTLEMENT):  # 意味着不在大厅
         MControl.moveclick(self_defined_args['结算页继续按钮坐标'][0], self_defined_args['结算页继续按钮坐标'][1])
         log_script("info", f"重连完成···类型：错误代码")
         return True
@@ -2887,14 +3364,12 @@ def reconnect() -> bool:
             if not pause_event.is_set():
                 pause_event.wait()
             if disconnect_check():
-                for sum in range(130, 80, -10):
-                    disconnect_confirm(sum)
-                    if not disconnect_check():
-                        break
+                retry_disconnect_confirm()
             time.sleep(1)
             MControl.moveclick(10, 10, click_delay=1)  # 登录界面“按空格以继续”
+            screen = screen_classifier.classify((MAIN_MENU, SETTLEMENT, MATCH_LOBBY, READY_ROOM), first_match=True)
             # 是否重进主页面判断
-            if mainjudge():
+            if screen.matched(MAIN_MENU):
                 log_script("info", f"重连---正在返回匹配大厅···")
                 MControl.moveclick(self_defined_args['主页面开始坐标'][0], self_defined_args['主页面开始坐标'][1],
                                    1)  # 点击开始
@@ -2907,12 +3382,12 @@ def reconnect() -> bool:
                                        1)
                 main_quit = True
             stage_mointor.check_stay_time(300)
-            if gameover():  # 特殊情况处理
+            if screen.matched(SETTLEMENT):  # 特殊情况处理
                 MControl.moveclick(self_defined_args['结算页继续按钮坐标'][0],
                                    self_defined_args['结算页继续按钮坐标'][1])
                 MControl.moveclick(10, 10, 1, 3)  # 避免遮挡
                 main_quit = True
-            if starthall() or readyhall():
+            if screen.matched(MATCH_LOBBY) or screen.matched(READY_ROOM):
                 main_quit = True
         log_script("info", f"重连完成···类型：断线")
         stage_mointor.exit_stage()
@@ -3338,6 +3813,26 @@ def afk() -> None:
     win32gui.SetForegroundWindow(hwnd)
     while True:
         reconnection = False
+        if circulate_number:
+            log_script("debug", f"第{circulate_number}次脚本循环截图缓存统计: {frame_cache.stats()}")
+            frame_cache.reset_stats()
+            log_script("debug", f"第{circulate_number}次脚本循环OCR执行/跳过统计: {region_change.stats()}")
+            log_script("debug", f"第{circulate_number}次脚本循环飞行记录占用: {flight_recorder.occupancy()}")
+            region_change.reset_stats()
+            log_script("debug", f"第{circulate_number}次脚本循环OCR结果缓存统计: {ocr_cache.stats()}")
+            ocr_cache.reset_stats()
+            log_script("debug", f"第{circulate_number}次脚本循环模板匹配统计: {template_matcher.stats()}")
+            template_matcher.reset_stats()
+            log_script("debug", f"第{circulate_number}次脚本循环预筛选拒绝率: {prefilter.stats()}")
+            prefilter.reset_stats()
+            prefilter.save()
+            log_script("debug", f"第{circulate_number}次脚本循环签名索引统计: {signature_index.stats()}")
+            signature_index.reset_stats()
+            signature_index.save()
+            log_script("debug", f"第{circulate_number}次脚本循环判定滤波纠正次数: {screen_classifier.filter_stats()}")
+            if isinstance(ocr_engine, PoolOcrEngine):
+                log_script("debug", f"第{circulate_number}次脚本循环识别进程状态: {ocr_engine.health_check(ping_interval=300)} "
+                                    f"{ocr_engine.stats()}")
         circulate_number += 1
         '''
         匹配
@@ -3345,6 +3840,7 @@ def afk() -> None:
         matching = False
         game_stage = '匹配'
         stage_monitor.enter_stage(game_stage)
+        screen_classifier.reset_filters()
         while not matching:
             if event.is_set():
                 break
@@ -3352,7 +3848,8 @@ def afk() -> None:
                 pause_event.wait()
 
             # 判断条件是否成立
-            if starthall():
+            screen = screen_classifier.classify((MATCH_LOBBY, DISCONNECT), first_match=True, smooth=True)
+            if screen.matched(MATCH_LOBBY):
                 stage_monitor.exit_stage()
                 log_script("info", f"第{circulate_number}次脚本循环---进入匹配大厅···")
                 if cfg.getboolean("CPCI", "rb_killer"):
@@ -3375,15 +3872,15 @@ def afk() -> None:
                         MControl.moveclick(self_defined_args['开始游戏按钮的坐标'][0],
                                            self_defined_args['开始游戏按钮的坐标'][1], 1)
                         time.sleep(0.5)
-                        if not starthall():
+                        if not starthall(use_signature=False):
                             break
 
                     MControl.moveclick(20, 689, 1, 5)  # 商城上空白
-                    if not starthall():
+                    if not starthall(use_signature=False):
                         matching = True
                         game_stage = ""
                         log_script("info", f"第{circulate_number}次脚本循环---开始匹配!")
-            elif disconnect_check():
+            elif screen.matched(DISCONNECT):
                 reconnection = reconnect()
                 matching = True
                 stage_monitor.exit_stage()
@@ -3413,6 +3910,7 @@ def afk() -> None:
         ready_room = dbdWindowUi.cb_debug.isChecked()
         game_stage = '准备'
         stage_monitor.enter_stage(game_stage)
+        screen_classifier.reset_filters()
         if ready_room:
             stage_monitor.exit_stage()
             game_stage = ""
@@ -3422,7 +3920,8 @@ def afk() -> None:
             if not pause_event.is_set():
                 pause_event.wait()
 
-            if readyhall():
+            screen = screen_classifier.classify((READY_ROOM, DISCONNECT), first_match=True, smooth=True)
+            if screen.matched(READY_ROOM):
                 stage_monitor.exit_stage()
                 log_script("info", f"第{circulate_number}次脚本循环---进入准备大厅···")
                 MControl.moveclick(10, 10, 1)
@@ -3430,15 +3929,15 @@ def afk() -> None:
                     MControl.moveclick(self_defined_args['准备就绪按钮的坐标'][0],
                                        self_defined_args['准备就绪按钮的坐标'][1], 1)
                     time.sleep(0.5)
-                    if not readyhall():
+                    if not readyhall(use_signature=False):
                         break
 
                 MControl.moveclick(20, 689, 1, 3)  # 商城上空白
-                if not readyhall():
+                if not readyhall(use_signature=False):
                     ready_room = True
                     game_stage = ""
                     log_script("info", f"第{circulate_number}次脚本循环---准备完成!")
-            elif disconnect_check():
+            elif screen.matched(DISCONNECT):
                 reconnection = reconnect()
                 ready_room = True
                 stage_monitor.exit_stage()
@@ -3475,13 +3974,15 @@ def afk() -> None:
         log_script("info", f"第{circulate_number}次脚本循环---进入对局···")
         game_stage = '结算'
         stage_monitor.enter_stage(game_stage)
+        screen_classifier.reset_filters()
         while not game:
             if event.is_set():
                 break
             if not pause_event.is_set():
                 pause_event.wait()
 
-            if gameover():
+            screen = screen_classifier.classify((SETTLEMENT, DISCONNECT), first_match=True, smooth=True)
+            if screen.matched(SETTLEMENT):
                 stage_monitor.exit_stage()
                 log_script("info", f"第{circulate_number}次脚本循环---游戏结束···")
                 stop_space = True  # 自动空格线程标志符
@@ -3503,10 +4004,10 @@ def afk() -> None:
                         delay=0.3,
                         click_delay=1
                     )
-                    if not gameover():
+                    if not gameover(use_signature=False):
                         break
                 MControl.moveclick(10, 10, 1, 3)  # 避免遮挡
-                if not gameover():
+                if not gameover(use_signature=False):
                     game = True
                     game_stage = ""
                     log_script("info", f"第{circulate_number}次脚本循环---正在返回匹配大厅···\n")
@@ -3515,12 +4016,11 @@ def afk() -> None:
                     game = True
                     stage_monitor.exit_stage()
                     game_stage = ""
-            else:
-                if disconnect_check():
-                    reconnection = reconnect()
-                    game = True
-                    stage_monitor.exit_stage()
-                    game_stage = ""
+            elif screen.matched(DISCONNECT):
+                reconnection = reconnect()
+                game = True
+                stage_monitor.exit_stage()
+                game_stage = ""
             stage_monitor.check_stay_time(900)
 
         # 重连返回值判断
@@ -3711,6 +4211,22 @@ def cleanup_resources():
             
         # 释放按键状态    
         release_all_keys()
+
+        # 释放截图资源
+        if 'capture_backend' in globals():
+            capture_backend.close()
+
+        # 释放OCR引擎
+        if globals().get('ocr_executor') is not None:
+            ocr_executor.shutdown(wait=False, cancel_futures=True)
+        if 'ocr_engine' in globals():
+            ocr_engine.close()
+
+        # 保存预筛选样本与签名索引
+        if 'prefilter' in globals():
+            prefilter.save()
+        if 'signature_index' in globals():
+            signature_index.save()
         
         # 关闭日志
         close_logger()
@@ -3729,6 +4245,7 @@ def cleanup_resources():
     
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # 打包后识别进程池需要
     anti_debug()  # 反调试
     gc.enable()
     BASE_DIR = os.path.dirname(os.path.realpath(sys.argv[0]))
@@ -3753,6 +4270,11 @@ if __name__ == '__main__':
     SDAGRS_PATH = os.path.join(BASE_DIR, "SDargs.json")
     LOG_PATH = os.path.join(BASE_DIR, "debug_data.log")
     CUSTOM_COMMAND_PATH = os.path.join(BASE_DIR, "custom_command.txt")
+    FLIGHT_RECORD_PATH = os.path.join(BASE_DIR, "flight_records")
+    RECORD_PATH = os.path.join(BASE_DIR, "recordings")
+    TEMPLATE_PATH = os.path.join(BASE_DIR, "templates")
+    PREFILTER_PATH = os.path.join(BASE_DIR, "prefilter.json")
+    SIGNATURE_PATH = os.path.join(BASE_DIR, "signatures.json")
 
     os.environ['OCR'] = OCR_PATH
     os.environ['TESSDATA_PREFIX'] = TESSDATA_PREFIX
@@ -3812,6 +4334,29 @@ if __name__ == '__main__':
                          '主页面逃生者坐标': [339, 320],
                          '主页面杀手坐标': [328, 224],
                          '坐标转换开关': 0,
+                         '截图缓存有效期': 150,
+                         '截图后端': 'gdi',
+                         '截图回放路径': '',
+                         '后台截图帧率': 0,
+                         '后台截图缓冲帧数': 3,
+                         '飞行记录帧数': 30,
+                         '飞行记录内存上限': 8,
+                         '录制录像': 0,
+                         '识别引擎': 'auto',
+                         '识别进程数': 2,
+                         '识别超时': 5,
+                         '合并识别': 0,
+                         'OCR缓存条数': 256,
+                         '并行识别线程数': 0,
+                         '模板匹配阈值': [0.9, 0.3],
+                         '预筛选': 2,
+                         '签名索引': [2, 4096],
+                         '关键字容错': 0.25,
+                         '判定滤波': {'mode': 'vote', 'n': 2, 'm': 3, 'alpha': 0.5, 'enter': 0.7, 'exit': 0.3},
+                         '识别配置': {
+                             name: {'lang': '', 'oem': 3, 'psm': 6, 'scale': 1, 'whitelist': '', 'threshold': 'fixed'}
+                             for name in ('play', 'ready', 'gameover', 'start', 'disconnect')
+                         },
                          }
     self_defined_args_original = copy.deepcopy(self_defined_args)
 
@@ -3921,6 +4466,32 @@ if __name__ == '__main__':
         dbdWindowUi.rb_english_change()
     custom_select = CustomSelectKiller()
     stage_monitor = Stage()
+    try:
+        capture_backend = create_capture_backend(self_defined_args['截图后端'], lambda: hwnd,
+                                                 self_defined_args['截图回放路径'])
+    except (ValueError, OSError) as e:
+        # 回放路径无效或后端名称错误时不影响界面启动，改用窗口截图
+        log.warning(f"截图后端配置无效，已改用gdi: {e}")
+        capture_backend = create_capture_backend('gdi', lambda: hwnd)
+    frame_cache = FrameCache(capture_backend.grab, self_defined_args['截图缓存有效期'] / 1000, lambda: hwnd)
+    capture_thread = None  # 后台截图线程
+    archive_recorder = None  # 录像录制
+    capture_state = threading.local()  # 各线程最近一次截图所用帧的标识(frame_id)
+    region_change = RegionChangeDetector()
+    ocr_cache = OcrResultCache(self_defined_args['OCR缓存条数'])
+    template_matcher = TemplateMatcher(TEMPLATE_PATH, *self_defined_args['模板匹配阈值'])
+    prefilter = PreFilter(PREFILTER_PATH)  # OCR前的颜色统计预筛选
+    signature_index = ScreenSignatureIndex(SIGNATURE_PATH, *self_defined_args['签名索引'])  # 已确认画面的哈希索引
+    screen_classifier = ScreenClassifier(capture_regions, lambda: VerdictFilter(**self_defined_args['判定滤波']),
+                                         lambda: getattr(capture_state, 'frame_id', None))
+    for screen_state, detect in ((MATCH_LOBBY, starthall), (READY_ROOM, readyhall), (SETTLEMENT, gameover),
+                                 (DISCONNECT, disconnect_check), (MAIN_MENU, mainjudge)):
+        screen_classifier.register(screen_state, detect, lambda detect=detect: [
+            region['coords'] for region in parse_regions(self_defined_args[detect.capture_range])])
+    ocr_executor = ThreadPoolExecutor(self_defined_args['并行识别线程数'], thread_name_prefix="ocr") \
+        if self_defined_args['并行识别线程数'] > 1 else None  # 多区域并行识别
+    flight_recorder = FlightRecorder(self_defined_args['飞行记录帧数'],
+                                     self_defined_args['飞行记录内存上限'] * 1024 * 1024)
     screen = QApplication.primaryScreen()
     logging_enabled = True  # 脚本日志记录标志
     begin_state = False  # 开始状态
@@ -3940,7 +4511,10 @@ if __name__ == '__main__':
     # 在主程序启动时创建监控线程
     memory_monitor = MemoryMonitor()
     memory_monitor.start()
-    pytesseract.pytesseract.tesseract_cmd = OCR_PATH  # 配置OCR路径
+    ocr_engine = create_ocr_engine(self_defined_args['识别引擎'], CHECK_PATH, TESSDATA_PREFIX,
+                                   on_fallback=lambda e: log.warning(f"进程内OCR不可用，已改用命令行识别: {e}"),
+                                   tesseract_cmd=OCR_PATH, pool_size=self_defined_args['识别进程数'],
+                                   timeout=self_defined_args['识别超时'])
 
     splash.show_message("正在检查通知...")
     notice('test gix')  # 通知消息
@@ -0,0 +1,35 @@
+"""FlightRecorder只记录部分区域时与整帧记录取相同的采样点"""
+
+import zlib
+
+import numpy as np
+
+from Utils.FlightRecorder import FlightRecorder
+from Utils.ImageProcess import crop
+
+
+def latest(recorder):
+    record = recorder._records[-1]
+    return np.frombuffer(zlib.decompress(record["data"]), dtype=np.uint8).reshape(record["shape"])
+
+
+def test_regions_match_downscaled_frame():
+    frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 4), dtype=np.uint8)
+    rects = [(1446, 771, 1920, 1080), (57, 46, 370, 171), (203, 78, 365, 135)]
+    regions, full = FlightRecorder(scale=4), FlightRecorder(scale=4)
+    regions.record_regions(rects, [crop(frame, *rect) for rect in rects])
+    full.record_frame(frame)
+
+    small = latest(regions)
+    assert small.shape == (270, 480, 3)
+    for x1, y1, x2, y2 in rects:
+        area = (slice(-(-y1 // 4), y2 // 4), slice(-(-x1 // 4), x2 // 4))
+        assert (small[area] == latest(full)[area]).all()
+
+
+def test_same_region_list_recorded_once():
+    recorder = FlightRecorder()
+    images = [np.zeros((8, 8, 4), dtype=np.uint8)]
+    recorder.record_regions([(0, 0, 8, 8)], images)
+    recorder.record_regions([(0, 0, 8, 8)], images)
+    assert recorder.occupancy()["frames"] == 1
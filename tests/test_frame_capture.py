@@ -0,0 +1,50 @@
+"""FrameCache在有效期内共用一帧截图"""
+
+import numpy as np
+
+from Utils.FrameCapture import FrameCache
+
+
+class CountingCapture:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return np.full((100, 200, 4), self.calls, dtype=np.uint8)
+
+
+def test_different_region_sets_share_one_capture():
+    capture = CountingCapture()
+    cache = FrameCache(capture, max_age=10)
+    first = cache.get_regions([(0, 0, 50, 50)])
+    generation = cache.last_generation
+    second = cache.get_regions([(10, 10, 60, 40), (150, 50, 200, 100)])
+    assert capture.calls == 1
+    assert cache.last_generation == generation
+    assert first[0].shape == (50, 50, 4) and second[1].shape == (50, 50, 4)
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalid_region_is_none():
+    cache = FrameCache(CountingCapture(), max_age=10)
+    assert cache.get_regions([(300, 0, 400, 50)]) == [None]
+
+
+def test_source_change_invalidates_frame():
+    capture = CountingCapture()
+    source = {"hwnd": 1}
+    cache = FrameCache(capture, max_age=10, source_func=lambda: source["hwnd"])
+    cache.get()
+    source["hwnd"] = 2
+    frame = cache.get()
+    assert capture.calls == 2
+    assert frame[0, 0, 0] == 2
+
+
+def test_expired_frame_is_recaptured():
+    capture = CountingCapture()
+    cache = FrameCache(capture, max_age=0)
+    cache.get_regions([(0, 0, 10, 10)])
+    cache.get_regions([(0, 0, 10, 10)])
+    assert capture.calls == 2
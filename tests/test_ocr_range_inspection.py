@@ -0,0 +1,94 @@
+"""ocr_range_inspection在replay/synthetic截图后端上的检测流程，OCR结果由桩函数提供"""
+
+import threading
+import types
+from configparser import ConfigParser
+
+import pytest
+
+main = pytest.importorskip("main")
+
+from Utils.CaptureBackend import SyntheticCaptureBackend
+from Utils.FlightRecorder import FlightRecorder
+from Utils.FrameCapture import FrameCache
+from Utils.PreFilter import PreFilter
+from Utils.ScreenSignature import ScreenSignatureIndex
+from Utils.TemplateMatch import TemplateMatcher
+
+CAPTURE_RANGE = '准备阶段的识别范围'
+THRESHOLD_NAME = '准备房间二值化阈值'
+KEYWORDS_NAME = '准备大厅识别关键字'
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    """在main模块中装配检测流程所需的全局对象"""
+    backend = SyntheticCaptureBackend(frame_count=1)
+    cfg = ConfigParser()
+    cfg.read_dict({"UPDATE": {"rb_chinese": "True", "rb_english": "False"}})
+    ui = types.SimpleNamespace(cb_debug=types.SimpleNamespace(isChecked=lambda: False),
+                               cb_bvinit=types.SimpleNamespace(isChecked=lambda: False))
+    globals_ = {
+        "self_defined_args": {
+            CAPTURE_RANGE: [1446, 771, 1920, 1080, 120],
+            THRESHOLD_NAME: [130, 0],
+            KEYWORDS_NAME: [["准备就绪", "READY"]],
+            '关键字容错': 0.25,
+            '预筛选': 0,
+            '合并识别': 0,
+            '识别配置': {},
+        },
+        "cfg": cfg,
+        "dbdWindowUi": ui,
+        "logging_enabled": False,
+        "capture_backend": backend,
+        "frame_cache": FrameCache(backend.grab, 0.15),
+        "capture_thread": None,
+        "archive_recorder": None,
+        "capture_state": threading.local(),
+        "flight_recorder": FlightRecorder(4, 1024 * 1024),
+        "template_matcher": TemplateMatcher(str(tmp_path)),
+        "prefilter": PreFilter(),
+        "signature_index": ScreenSignatureIndex(),
+        "stage_monitor": main.Stage(),
+        "ocr_executor": None,
+    }
+    for name, value in globals_.items():
+        monkeypatch.setattr(main, name, value, raising=False)
+    return globals_
+
+
+def make_detector(ocr_result):
+    calls = []
+
+    def fake_ocr(x1, y1, x2, y2, **kwargs):
+        calls.append((x1, y1, x2, y2))
+        return ocr_result
+
+    detector = main.ocr_range_inspection(KEYWORDS_NAME, fake_ocr, CAPTURE_RANGE, THRESHOLD_NAME, "ready")(
+        lambda: None)
+    return detector, calls
+
+
+def test_keyword_hit_returns_true(pipeline):
+    detector, calls = make_detector("准备就绪")
+    evidence = []
+    assert detector(evidence=evidence) is True
+    assert calls == [(1446, 771, 1920, 1080)]
+    assert evidence[0]["matched"] and evidence[0]["similarity"] == 1.0
+
+
+def test_misread_keyword_hit_returns_true(pipeline):
+    detector, _ = make_detector("准各就绪")
+    assert detector() is True
+
+
+def test_keyword_miss_returns_false(pipeline):
+    detector, _ = make_detector("开始游戏")
+    assert detector() is False
+
+
+def test_confirmed_hit_feeds_signature_index(pipeline):
+    detector, _ = make_detector("READY")
+    assert detector() is True
+    assert pipeline["signature_index"].stats()["entries"] == 1
@@ -0,0 +1,44 @@
+"""TemplateMatcher按检测名称与关键字区分模板"""
+
+import numpy as np
+
+from Utils.ImageProcess import to_gray
+from Utils.TemplateMatch import TemplateMatcher
+
+RESOLUTION = "1920x1080"
+REGION = (1446, 771, 1920, 1080)  # 匹配大厅与准备房间共用的识别区域
+BUTTON = (1600, 900, 1800, 960)
+
+
+def make_region(seed):
+    return np.random.default_rng(seed).integers(0, 255, (REGION[3] - REGION[1], REGION[2] - REGION[0], 4),
+                                                dtype=np.uint8)
+
+
+def button_gray(region):
+    return to_gray(region[BUTTON[1] - REGION[1]:BUTTON[3] - REGION[1], BUTTON[0] - REGION[0]:BUTTON[2] - REGION[0]])
+
+
+def test_template_only_matches_its_detector(tmp_path):
+    matcher = TemplateMatcher(str(tmp_path))
+    lobby = make_region(0)
+    matcher.save("eng", RESOLUTION, "play", "PLAY", BUTTON, button_gray(lobby))
+    assert matcher.match("eng", RESOLUTION, "play", REGION, lobby, ["PLAY"]) is True
+    assert matcher.match("eng", RESOLUTION, "ready", REGION, lobby, ["READY"]) is None
+
+
+def test_templates_of_same_rect_do_not_overwrite(tmp_path):
+    matcher = TemplateMatcher(str(tmp_path))
+    lobby, ready_room = make_region(0), make_region(1)
+    matcher.save("eng", RESOLUTION, "play", "PLAY", BUTTON, button_gray(lobby))
+    matcher.save("eng", RESOLUTION, "ready", "READY", BUTTON, button_gray(ready_room))
+    assert matcher.match("eng", RESOLUTION, "play", REGION, lobby, ["PLAY"]) is True
+    assert matcher.match("eng", RESOLUTION, "ready", REGION, ready_room, ["READY"]) is True
+    assert matcher.match("eng", RESOLUTION, "ready", REGION, lobby, ["READY"]) is False
+
+
+def test_removed_keyword_disables_template(tmp_path):
+    matcher = TemplateMatcher(str(tmp_path))
+    lobby = make_region(0)
+    matcher.save("eng", RESOLUTION, "play", "PLAY", BUTTON, button_gray(lobby))
+    assert matcher.match("eng", RESOLUTION, "play", REGION, lobby, ["开始游戏"]) is None